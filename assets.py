@@ -0,0 +1,114 @@
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+
+class SilentSound:
+    # Stands in for pygame.mixer.Sound when the game runs without audio
+    def play(self, *args, **kwargs):
+        pass
+
+    def set_volume(self, volume):
+        pass
+
+
+class SoundHandle:
+    # A sound that may still be decoding. The first call that needs the sound waits for it,
+    # and lazy sounds only start decoding then.
+    def __init__(self, assets, name):
+        self.assets = assets
+        self.name = name
+        self.sound = None
+
+    def get(self):
+        if self.sound is None:
+            self.sound = self.assets.load_sound(self.name).result()
+        return self.sound
+
+    def play(self, *args, **kwargs):
+        return self.get().play(*args, **kwargs)
+
+    def set_volume(self, volume):
+        self.get().set_volume(volume)
+
+
+class AssetManager:
+    # Decodes every asset in the manifest exactly once. Sounds and font files are read on a thread
+    # pool as soon as the manager is created, except sounds marked lazy, which wait until first use.
+    # timings holds how long each asset took to load.
+    def __init__(self, manifest_path, audio=True, workers=4):
+        with open(manifest_path) as f:
+            self.manifest = json.load(f)
+        self.audio = audio
+
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix="assets")
+        self.sounds = {}
+        self.font_files = {}
+        self.fonts = {}
+        self.images = {}
+        self.timings = {}
+
+        for path in self.manifest["fonts"]:
+            self.font_files[path] = self.pool.submit(self.timed, path, self.read_file, path)
+        if self.audio:
+            for name, entry in self.manifest["sounds"].items():
+                if not entry.get("lazy", False):
+                    self.load_sound(name)
+
+    def timed(self, name, load, *args):
+        start = time.perf_counter()
+        asset = load(*args)
+        self.timings[name] = time.perf_counter() - start
+        return asset
+
+    @staticmethod
+    def read_file(path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    def decode_sound(self, name):
+        entry = self.manifest["sounds"][name]
+        sound = pygame.mixer.Sound(entry["path"])
+        sound.set_volume(entry.get("volume", 1.0))
+        return sound
+
+    def load_sound(self, name):
+        future = self.sounds.get(name)
+        if future is None:
+            future = self.pool.submit(self.timed, name, self.decode_sound, name)
+            self.sounds[name] = future
+        return future
+
+    def sound(self, name):
+        if not self.audio:
+            return SilentSound()
+        return SoundHandle(self, name)
+
+    def font(self, path, size):
+        # One Font per file and size, built from the file contents read at startup
+        key = (path, size)
+        font = self.fonts.get(key)
+        if font is None:
+            font_file = self.font_files.get(path)
+            if font_file is None:
+                font_file = self.font_files[path] = self.pool.submit(self.timed, path, self.read_file, path)
+            font = pygame.font.Font(io.BytesIO(font_file.result()), size)
+            self.fonts[key] = font
+        return font
+
+    def image(self, path):
+        image = self.images.get(path)
+        if image is None:
+            image = self.images[path] = self.timed(path, pygame.image.load, path)
+        return image
+
+    def report(self):
+        lines = [f"{name:<20} {seconds * 1000:8.2f} ms" for name, seconds in sorted(self.timings.items(), key=lambda item: -item[1])]
+        lines.append(f"{'total':<20} {sum(self.timings.values()) * 1000:8.2f} ms")
+        return "\n".join(lines)
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
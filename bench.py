@@ -0,0 +1,177 @@
+import os
+
+# The benchmarks run without a real window or sound card, so they work on a CI box
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pygame
+
+from main import WINDOW_SIZE, Bomb, Game, TeleportNearestPlatform
+
+
+def press(game, key):
+    game.handle_event(pygame.event.Event(pygame.KEYDOWN, key=key))
+
+
+def catalog_ability(game, ability_type):
+    return next(ability for ability in game.ability_catalog if type(ability) is ability_type)
+
+
+def keep_alive(game):
+    # Benchmarks measure a run in progress, so the player never dies (and data.txt is never written)
+    game.extra_life = 1_000_000
+    game.player_score = max(game.player_score, 1_000)
+
+
+def idle_climb(game, frame):
+    # Climbs one platform at a time by teleporting to the nearest platform above
+    keep_alive(game)
+    if frame % 40 == 0:
+        catalog_ability(game, TeleportNearestPlatform).triggered()
+    if frame % 40 == 5:
+        press(game, pygame.K_SPACE)
+
+
+def bomb_chain(game, frame):
+    # A new bomb as soon as the last one has landed, smashing platforms on the way up
+    keep_alive(game)
+    if not game.bomb_set:
+        catalog_ability(game, Bomb).triggered()
+
+
+def heavy_rain(game, frame):
+    game.rain_count = 1000
+    idle_climb(game, frame)
+
+
+def hand_cycle(game, frame):
+    # Opens and closes the hand, moving the selection and reshuffling so cards keep animating
+    keep_alive(game)
+    if frame % 60 == 0:
+        press(game, pygame.K_TAB)
+    elif game.ability_display and frame % 60 == 30:
+        press(game, pygame.K_r)
+    elif game.ability_display and frame % 5 == 0:
+        press(game, pygame.K_e if frame % 20 < 10 else pygame.K_q)
+
+
+SCENARIOS = {
+    "idle_climb": idle_climb,
+    "bomb_chain": bomb_chain,
+    "heavy_rain": heavy_rain,
+    "hand_cycle": hand_cycle,
+}
+
+
+def run_frames(game, script, first, count, times=None):
+    # update() without the 60 fps cap
+    for frame in range(first, first + count):
+        start = time.perf_counter()
+        script(game, frame)
+        game.step()
+        if not game.headless:
+            game.render()
+            if game.renderer is not None:
+                game.renderer.present()
+            else:
+                pygame.display.update()
+        if times is not None:
+            times.append(time.perf_counter() - start)
+
+
+def run_scenario(name, frames, warmup, seed, headless, dirty_rendering):
+    script = SCENARIOS[name]
+
+    game = Game(WINDOW_SIZE, "Salio's Clamber benchmark", r"salios_logo.png", headless, seed, dirty_rendering)
+    run_frames(game, script, 0, warmup)
+    times = []
+    run_frames(game, script, warmup, frames, times)
+    game.close()
+
+    # Memory is measured on a second, identical run because tracing allocations slows every frame
+    game = Game(WINDOW_SIZE, "Salio's Clamber benchmark", r"salios_logo.png", headless, seed, dirty_rendering)
+    run_frames(game, script, 0, warmup)
+    tracemalloc.start()
+    run_frames(game, script, warmup, frames)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    game.close()
+
+    times = np.array(times) * 1000
+    return {
+        "frames": frames,
+        "fps": frames / (times.sum() / 1000),
+        "p50_ms": float(np.percentile(times, 50)),
+        "p95_ms": float(np.percentile(times, 95)),
+        "p99_ms": float(np.percentile(times, 99)),
+        "max_ms": float(times.max()),
+        "peak_kib": peak / 1024,
+    }
+
+
+def compare(results, baseline, tolerance):
+    # Lines describing each scenario against the baseline, and whether any got worse than tolerance allows
+    lines = []
+    regressed = False
+    for name, result in results.items():
+        if name not in baseline:
+            lines.append(f"{name:<12} no baseline")
+            continue
+        base = baseline[name]
+        fps_change = result["fps"] / base["fps"] - 1
+        p50_change = result["p50_ms"] / base["p50_ms"] - 1
+        p99_change = result["p99_ms"] / base["p99_ms"] - 1
+        peak_change = result["peak_kib"] / base["peak_kib"] - 1 if base["peak_kib"] else 0
+        # p99 is reported but too noisy over a short run to fail on
+        worse = fps_change < -tolerance or p50_change > tolerance or peak_change > tolerance
+        regressed = regressed or worse
+        lines.append(f"{name:<12} fps {fps_change:+7.1%}  p50 {p50_change:+7.1%}  p99 {p99_change:+7.1%}  peak {peak_change:+7.1%}{'  REGRESSION' if worse else ''}")
+    return lines, regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the game through scripted stress scenarios")
+    parser.add_argument("scenarios", nargs="*", help=f"scenarios to run, from {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("--frames", type=int, default=1200, help="measured frames per scenario")
+    parser.add_argument("--warmup", type=int, default=120, help="frames run before measuring")
+    parser.add_argument("--seed", type=int, default=1, help="seed for every scenario")
+    parser.add_argument("--headless", action="store_true", help="benchmark the simulation only, without rendering")
+    parser.add_argument("--dirty-rects", action="store_true", help="render with the dirty rectangle renderer")
+    parser.add_argument("--output", metavar="PATH", help="write the results to PATH as JSON, usable as a baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="compare the results against a stored baseline")
+    parser.add_argument("--tolerance", type=float, default=.1, help="relative change that counts as a regression")
+    args = parser.parse_args()
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error(f"unknown scenario {name!r}")
+
+    results = {}
+    print(f"{'scenario':<12}{'fps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'peak KiB':>11}")
+    for name in args.scenarios or SCENARIOS:
+        result = run_scenario(name, args.frames, args.warmup, args.seed, args.headless, args.dirty_rects)
+        results[name] = result
+        print(f"{name:<12}{result['fps']:9.1f}{result['p50_ms']:9.2f}{result['p95_ms']:9.2f}{result['p99_ms']:9.2f}{result['max_ms']:9.2f}{result['peak_kib']:11.0f}")
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        lines, regressed = compare(results, baseline, args.tolerance)
+        print()
+        print("\n".join(lines))
+        if regressed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import heapq
+import itertools
+
+
+class EffectScheduler:
+    # Timed effects in a heap ordered by the game time they expire at, so a frame only touches the
+    # effects that are due. Every effect has a key; scheduling a key that is still pending moves its
+    # expiry, and the entry it replaces is skipped when it reaches the top of the heap.
+    def __init__(self):
+        self.now = 0
+        self.heap = []
+        self.pending = {}
+        self.order = itertools.count()
+
+    def __len__(self):
+        return len(self.pending)
+
+    def schedule(self, key, duration, callback):
+        expires = self.now + duration
+        entry = (expires, next(self.order), key, callback)
+        self.pending[key] = entry
+        heapq.heappush(self.heap, entry)
+
+    def advance(self, dt):
+        # Moves game time on by dt and runs the callbacks of every effect that has expired
+        self.now += dt
+        while self.heap and self.heap[0][0] <= self.now:
+            entry = heapq.heappop(self.heap)
+            key = entry[2]
+            if self.pending.get(key) is entry:
+                del self.pending[key]
+                entry[3]()
+
+    def entries(self):
+        # (expires, key, callback) of every pending effect, in the order they will run
+        return [(expires, key, callback) for expires, order, key, callback in sorted(self.pending.values())]
+
+    def load(self, now, entries):
+        # Replaces the schedule with entries as returned by entries()
+        self.clear()
+        self.now = now
+        for expires, key, callback in entries:
+            self.schedule(key, expires - now, callback)
+
+    def clear(self):
+        self.heap.clear()
+        self.pending.clear()
@@ -0,0 +1,215 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import multiprocessing
+import random
+import time
+
+import numpy as np
+import pygame
+
+from main import WINDOW_SIZE, Game
+
+
+# Actions 0-5 are movement (none, left, right), each without and with a jump; actions 6-9 play the
+# card in that slot of the hand
+MOVES = [(False, False), (True, False), (False, True)]
+MOVE_ACTIONS = 2 * len(MOVES)
+ACTIONS = MOVE_ACTIONS + 4
+
+# Observation layout: player state, the platforms around the player and the cards in hand
+PLAYER_FEATURES = 8
+NEARBY_PLATFORMS = 8
+PLATFORM_FEATURES = 3
+CARD_FEATURES = 3
+OBSERVATION_SIZE = PLAYER_FEATURES + NEARBY_PLATFORMS * PLATFORM_FEATURES + 4 * CARD_FEATURES
+
+
+class ClamberEnv:
+    # Drives a headless Game through discrete actions. Every action holds for frame_skip frames and
+    # the reward is the gain in final score. Actions are key events, so a recorded run still replays exactly.
+    def __init__(self, frame_skip=4, max_frames=None):
+        self.frame_skip = frame_skip
+        self.max_frames = max_frames
+        self.game = None
+
+    def reset(self, seed=None):
+        if seed is None:
+            seed = random.getrandbits(32)
+        if self.game is None:
+            self.game = Game(WINDOW_SIZE, "Salio's Clamber", r"salios_logo.png", True, seed)
+        else:
+            self.game.restart(seed)
+        self.start_frame = self.game.frame
+        return self.observation()
+
+    def press(self, key, down=True):
+        self.game.handle_event(pygame.event.Event(pygame.KEYDOWN if down else pygame.KEYUP, key=key))
+
+    def play_card(self, slot):
+        game = self.game
+        if slot >= len(game.abilities):
+            return
+        while game.selected_ability != slot:
+            self.press(pygame.K_e)
+        self.press(pygame.K_TAB)
+        self.press(pygame.K_RETURN)
+        # A card the player cannot afford leaves the hand open
+        if game.ability_display:
+            self.press(pygame.K_TAB)
+
+    def step(self, action):
+        game = self.game
+        if action < MOVE_ACTIONS:
+            left, right = MOVES[action % len(MOVES)]
+            if left != game.player_left:
+                self.press(pygame.K_a, left)
+            if right != game.player_right:
+                self.press(pygame.K_d, right)
+            if action >= len(MOVES):
+                self.press(pygame.K_SPACE)
+        else:
+            self.play_card(action - MOVE_ACTIONS)
+
+        score = game.player_final_score
+        for i in range(self.frame_skip):
+            game.update()
+            if game.game_over:
+                break
+
+        reward = game.player_final_score - score
+        done = game.game_over or (self.max_frames is not None and game.frame - self.start_frame >= self.max_frames)
+        return self.observation(), reward, done, {"score": game.player_final_score, "frame": game.frame - self.start_frame}
+
+    def observation(self):
+        game = self.game
+        player = game.player_character
+        observation = np.zeros(OBSERVATION_SIZE, dtype=np.float32)
+        observation[:PLAYER_FEATURES] = (player.x, player.y + game.camera_y, game.player_velocity.x, game.player_velocity.y,
+                                         game.player_jumps, game.player_grounded, game.camera_speed, game.player_score)
+
+        # Platforms just below and above the player, relative to the player. Each slot always holds the
+        # same neighbour, the first two the platforms below; missing ones stay zero, present flag included
+        index = game.platforms.split(player.bottom)
+        offset = PLAYER_FEATURES
+        for platform_index in range(index - 2, index - 2 + NEARBY_PLATFORMS):
+            if 0 <= platform_index < len(game.platforms):
+                platform = game.platforms[platform_index]
+                observation[offset:offset + PLATFORM_FEATURES] = (platform.x - player.x, platform.y - player.y, 1)
+            offset += PLATFORM_FEATURES
+
+        # Each card as its catalog index, its cost and whether the player can afford it
+        offset = PLAYER_FEATURES + NEARBY_PLATFORMS * PLATFORM_FEATURES
+        for ability in game.abilities:
+            catalog_index = next(index for index, entry in enumerate(game.ability_catalog) if entry.name == ability.name)
+            observation[offset:offset + CARD_FEATURES] = (catalog_index, ability.cost, game.player_score >= ability.cost)
+            offset += CARD_FEATURES
+        return observation
+
+    def close(self):
+        if self.game is not None:
+            self.game.close()
+
+
+def worker(connection, count, frame_skip, max_frames):
+    # Hosts count environments in a child process and serves reset/step commands for all of them
+    envs = [ClamberEnv(frame_skip, max_frames) for i in range(count)]
+    while True:
+        command, arguments = connection.recv()
+        if command == "reset":
+            connection.send(np.stack([env.reset(seed) for env, seed in zip(envs, arguments)]))
+        elif command == "step":
+            actions, seeds = arguments
+            results = []
+            for env, action, seed in zip(envs, actions, seeds):
+                observation, reward, done, info = env.step(action)
+                if done:
+                    # The finished run is reported through info and the environment starts the next one
+                    info["final_observation"] = observation
+                    observation = env.reset(seed)
+                results.append((observation, reward, done, info))
+            connection.send(results)
+        elif command == "close":
+            for env in envs:
+                env.close()
+            connection.close()
+            break
+
+
+class VectorEnv:
+    # num_envs independent environments spread over worker processes, stepped in lockstep with
+    # batched arrays. Environments reset themselves when a run ends; run k of environment i uses
+    # seed + i + k * num_envs, so a batch of rollouts is reproducible from one seed.
+    def __init__(self, num_envs, workers=None, seed=0, frame_skip=4, max_frames=None):
+        self.num_envs = num_envs
+        self.workers = min(num_envs, workers or os.cpu_count() or 1)
+        self.seed = seed
+        self.runs = np.zeros(num_envs, dtype=np.int64)
+
+        counts = [num_envs // self.workers + (i < num_envs % self.workers) for i in range(self.workers)]
+        self.slices = []
+        self.connections = []
+        self.processes = []
+        start = 0
+        for count in counts:
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=worker, args=(child, count, frame_skip, max_frames), daemon=True)
+            process.start()
+            self.connections.append(parent)
+            self.processes.append(process)
+            self.slices.append(slice(start, start + count))
+            start += count
+
+    def run_seeds(self, runs):
+        return (np.arange(self.num_envs) + self.seed + runs * self.num_envs).tolist()
+
+    def reset(self):
+        self.runs[:] = 0
+        seeds = self.run_seeds(self.runs)
+        for connection, part in zip(self.connections, self.slices):
+            connection.send(("reset", seeds[part]))
+        return np.concatenate([connection.recv() for connection in self.connections])
+
+    def step(self, actions):
+        # Returns (observations, rewards, dones, infos) with one row per environment
+        actions = np.asarray(actions).tolist()
+        # The seed each environment starts its next run with, should this step end the current one
+        seeds = self.run_seeds(self.runs + 1)
+        for connection, part in zip(self.connections, self.slices):
+            connection.send(("step", (actions[part], seeds[part])))
+        results = [result for connection in self.connections for result in connection.recv()]
+        observations = np.stack([result[0] for result in results])
+        rewards = np.array([result[1] for result in results], dtype=np.float32)
+        dones = np.array([result[2] for result in results])
+        self.runs += dones
+        return observations, rewards, dones, [result[3] for result in results]
+
+    def close(self):
+        for connection in self.connections:
+            connection.send(("close", None))
+        for process in self.processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure rollout throughput with random actions")
+    parser.add_argument("--envs", type=int, default=8, help="number of environments")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--steps", type=int, default=1000, help="batched steps to run")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    envs = VectorEnv(args.envs, args.workers, args.seed)
+    rng = np.random.default_rng(args.seed)
+    envs.reset()
+    finished = []
+    start = time.perf_counter()
+    for i in range(args.steps):
+        observations, rewards, dones, infos = envs.step(rng.integers(ACTIONS, size=args.envs))
+        finished.extend(info["score"] for info, done in zip(infos, dones) if done)
+    elapsed = time.perf_counter() - start
+    envs.close()
+    print(f"{args.steps * args.envs / elapsed:.0f} env steps/s over {envs.workers} workers, {len(finished)} runs finished")
@@ -1,11 +1,46 @@
 import pygame
+import numpy as np
 import sys
 import os
 import random
-import math
+import time
+import argparse
+
+from assets import AssetManager
+from effects import EffectScheduler
+from particles import ParticleSystem
+from profiler import FrameProfiler
+from quality import QualityGovernor
+from rendering import CardRenderer, DirtyRenderer, TextCache
+from replay import Replay, ReplayRecorder, decode_keyframe, encode_keyframe
+from scores import ScoreStore
+from world import PlatformIndex, WorldGenerator
+
+
+class Tween:
+    # Moves a card from start to end over duration frames: speeding up for the first fifth, coasting,
+    # then slowing down over the last fifth
+    __slots__ = ("full_speed", "acceleration", "full_speed_time", "deceleration_time", "elapsed", "duration", "end")
+
+    def __init__(self, start, end, duration):
+        self.full_speed = pygame.Vector2((end.x - start.x)/(duration * 0.8), (end.y - start.y)/(duration * 0.8))
+        self.acceleration = self.full_speed/(duration * 0.2)
+        self.full_speed_time = duration * 0.2
+        self.deceleration_time = duration * 0.8
+        self.elapsed = 0
+        self.duration = duration
+        self.end = end
 
 
 class Ability:
+    # Cards are slotted records; every subclass adds behaviour only and declares no slots of its own
+    __slots__ = ("name", "description", "cost", "size", "og_pos", "pos", "game", "velocity", "animation", "selected", "color", "invalid", "invalid_count")
+
+    selected_color = (252, 136, 109)
+    normal_color = (232, 116, 89)
+    invalid_color = (255, 106, 79)
+    invalid_length = 8
+
     def __init__(self, name, description, pos, size, game, cost):
         self.name = name
         self.description = description
@@ -20,15 +55,10 @@ class Ability:
         self.animation = None
 
         self.selected = False
-
-        self.selected_color = (252, 136, 109)
-        self.normal_color = (232, 116, 89)
         self.color = self.normal_color
-        self.invalid_color = (255, 106, 79)
 
         self.invalid = False
         self.invalid_count = 0
-        self.invalid_length = 8
 
 
 
@@ -47,26 +77,25 @@ class Ability:
             elif not self.selected and self.color != self.normal_color:
                 self.color = self.normal_color
 
-        pygame.draw.rect(self.game.display, self.color, pygame.Rect(self.pos, self.size), 0, 16)
-        font_size = self.game.card_font.size(self.name)
-        font_position = (self.pos.x + (self.size[0]/2) - font_size[0]/2, self.pos.y + (self.size[1]/2) - font_size[1]/2)
-        self.game.display.blit(self.game.card_font.render(self.name, True, (0, 0, 0)), font_position)
+        face = self.game.card_renderer.face(self.game.card_font, self.name, self.size, self.color)
+        self.game.mark(self.game.display.blit(face, pygame.Rect(self.pos, self.size)))
 
 
     def update(self):
-        if self.animation is not None:
-            if self.animation[4] < self.animation[5]:
-                if self.animation[4] < self.animation[2]:
-                    self.velocity += self.animation[1]
-                elif self.animation[4] >= self.animation[3]:
-                    self.velocity -= self.animation[1]
+        animation = self.animation
+        if animation is not None:
+            if animation.elapsed < animation.duration:
+                if animation.elapsed < animation.full_speed_time:
+                    self.velocity += animation.acceleration
+                elif animation.elapsed >= animation.deceleration_time:
+                    self.velocity -= animation.acceleration
                 else:
-                    self.velocity = self.animation[0]
+                    self.velocity = animation.full_speed
 
-                self.animation[4] += 1
+                animation.elapsed += 1
 
-            elif self.animation[4] >= self.animation[5]:
-                self.pos = pygame.Vector2(self.animation[6].x, self.animation[6].y)
+            else:
+                self.pos = pygame.Vector2(animation.end.x, animation.end.y)
                 self.velocity = pygame.Vector2(0, 0)
                 self.animation = None
 
@@ -86,21 +115,15 @@ class Ability:
 
 
     def animate(self, starting_pos, ending_pos, time):
-        a = ending_pos.x - starting_pos.x
-        b = ending_pos.y - starting_pos.y
-        full_speed = pygame.Vector2(a/(time * 0.8), b/(time * 0.8))
-
-        acceleration =  full_speed/(time * 0.2)
-        full_speed_time = (time * 0.2)
-        deceleration_time = (time * 0.8)
-
-        return [full_speed, acceleration, full_speed_time, deceleration_time, 0, time, ending_pos]
+        return Tween(starting_pos, ending_pos, time)
 
     def triggered(self):
         pass
 
 
 class ResetCamera(Ability):
+    __slots__ = ()
+
     def triggered(self):
         if not self.game.bomb_set:
             self.game.slow_down_sfx.play()
@@ -108,29 +131,40 @@ class ResetCamera(Ability):
 
 
 class Teleport(Ability):
+    __slots__ = ()
+
     def triggered(self):
         self.game.teleport_sfx.play()
-        top_platform = None
-        for platform in self.game.platforms: 
-            if platform[1].y >= 0:
-                top_platform = platform[1]
+        top_platform = self.game.platforms.top_visible(-self.game.camera_y)
 
         self.game.player_character.y = top_platform.y - self.game.player_character[3]
         self.game.player_character.x = top_platform.x + ((self.game.platform_size[0]/2) - (self.game.player_character[2]/2))
 
 class UnlimitedJumps(Ability):
+    __slots__ = ()
+
     def triggered(self):
         self.game.limit_jumps = False
         self.game.player_jumps = 2
-        self.game.unlimited_jump_endtime = pygame.time.get_ticks() + self.game.unlimited_jump_length
+        self.game.effects.schedule("unlimited_jumps", self.game.unlimited_jump_length, self.expire)
+
+    def expire(self):
+        self.game.limit_jumps = True
 
 class TripleJump(Ability):
+    __slots__ = ()
+
     def triggered(self):
         self.game.triple_jump = True
-        self.game.triple_jump_endtime = pygame.time.get_ticks() + self.game.triple_jump_length
+        self.game.effects.schedule("triple_jump", self.game.triple_jump_length, self.expire)
         self.game.player_jumps = 3
 
+    def expire(self):
+        self.game.triple_jump = False
+
 class Bomb(Ability):
+    __slots__ = ()
+
     def triggered(self):
         self.game.bomb_sfx.play()
         bomb_force = 100
@@ -139,235 +173,221 @@ class Bomb(Ability):
         self.game.player_jumps = 0
         self.game.bomb_set = True
 
+        if self.game.headless:
+            return
         for i in range(3):
-            rand_gradient = random.choice([(255, 124, 5), (255, 150, 55), (255, 166, 85)])
-            particle_pos = pygame.Vector2(self.game.player_character.x + (self.game.player_size[0]/2), self.game.player_character.y + self.game.player_size[1])
-            rand_size = random.randint(10, 15)
-            self.game.particles.append(Particle(particle_pos, 10, rand_gradient, (rand_size, rand_size), (-10, 10), (10, 15), .01, self.game, True))
+            rand_gradient = [(255, 124, 5), (255, 150, 55), (255, 166, 85)][self.game.fx_rng.integers(3)]
+            particle_pos = pygame.Vector2(self.game.player_character.x + (self.game.player_size[0]/2), self.game.player_character.y + self.game.camera_y + self.game.player_size[1])
+            rand_size = self.game.fx_rng.integers(10, 15, endpoint=True)
+            self.game.particles.burst(particle_pos, self.game.quality.budget(10), rand_gradient, (rand_size, rand_size), (-10, 10), (10, 15), .01, self.game.fx_rng, self.game.burst_lifetime)
 
 
 class TeleportNearestPlatform(Ability):
+    __slots__ = ()
+
     def triggered(self):
         self.game.teleport_sfx.play()
-        for platform in self.game.platforms:
-            if platform[1].y < self.game.player_character.y:
-                self.game.player_character.x = platform[1].x + (self.game.platform_size[0]/2) - (self.game.player_size[0]/2)
-                self.game.player_character.y = platform[1].y - (self.game.player_size[1] - 5)
-                break
+        platform = self.game.platforms.nearest_above(self.game.player_character.y)
+        if platform is not None:
+            self.game.player_character.x = platform.x + (self.game.platform_size[0]/2) - (self.game.player_size[0]/2)
+            self.game.player_character.y = platform.y - (self.game.player_size[1] - 5)
 
 class JumpBoost(Ability):
+    __slots__ = ()
+
     def triggered(self):
         if not self.game.boost_jump:
             self.game.boost_sfx.play()
             self.game.player_jumps = 2
             self.game.boost_jump = True
-            self.game.boost_jump_endtime = pygame.time.get_ticks() + self.game.boost_jump_length
+            self.game.effects.schedule("boost_jump", self.game.boost_jump_length, self.expire)
         else:
             self.invalidate()
 
+    def expire(self):
+        self.game.boost_jump = False
+
 
 class SpeedBoost(Ability):
+    __slots__ = ()
+
     def triggered(self):
         if not self.game.boost_speed:
             self.game.boost_sfx.play()
             self.game.player_speed *= 1.5
             self.game.boost_speed = True
-            self.game.boost_speed_endtime = pygame.time.get_ticks() + self.game.boost_speed_length
+            self.game.effects.schedule("boost_speed", self.game.boost_speed_length, self.expire)
         else:
             self.invalidate()
 
+    def expire(self):
+        self.game.boost_speed = False
+        self.game.player_speed /= 1.5
+
 
 class ExtraLife(Ability):
+    __slots__ = ()
+
     def triggered(self):
         self.game.extra_life += 1
-        self.game.extra_life_endtime = pygame.time.get_ticks() + self.game.extra_life_length
+        self.game.effects.schedule("extra_life", self.game.extra_life_length, self.expire)
+
+    def expire(self):
+        self.game.extra_life = 0
 
 class ZeroGravity(Ability):
+    __slots__ = ()
+
     def triggered(self):
         self.game.zero_gravity_sfx.play()
         self.game.zero_gravity = True
         self.game.player_velocity.y = -5
-        self.game.zero_gravity_endtime = pygame.time.get_ticks() + self.game.zero_gravity_length
+        self.game.effects.schedule("zero_gravity", self.game.zero_gravity_length, self.expire)
+
+    def expire(self):
+        self.game.camera_speed = self.game.initial_camera_speed
+        self.game.zero_gravity = False
 
 class Jump(Ability):
+    __slots__ = ()
+
     def triggered(self):
         self.game.power_jump_sfx.play()
         self.game.player_velocity.y = -self.game.player_jump_force * 1.5
 
 
 class ExtraPoints(Ability):
+    __slots__ = ()
+
     def triggered(self):
         self.game.extra_points = True
-        self.game.extra_points_endtime = pygame.time.get_ticks() + self.game.extra_points_length
+        self.game.effects.schedule("extra_points", self.game.extra_points_length, self.expire)
 
-class Particle:
-    def __init__(self, pos, particle_count, color, size, spread_range_x, spread_range_y, air_resistance, game, apply_time):
-        self.game = game
-        self.gravity_value = self.game.gravity
-        self.air_resistance = air_resistance
-        self.color = color
-        self.apply_time = apply_time
-
-        self.particles = []
-        for i in range(particle_count):
-            self.particles.append([pygame.Rect(pygame.Vector2(pos.x, pos.y), size), pygame.Vector2(random.randint(spread_range_x[0], spread_range_x[1]), random.randint(spread_range_y[0], spread_range_y[1]))])
-
-    def render(self, display):
-        for particle in self.particles:
-            if self.apply_time:
-                particle[0].y += particle[1].y * self.game.time
-                particle[1].y += self.gravity_value * self.game.time
-                particle[0].x += particle[1].x * self.game.time
-                particle[1].x -= (math.copysign(1, particle[1].x) * self.air_resistance) * self.game.time
-            else:
-                particle[0].y += particle[1].y
-                particle[1].y += self.gravity_value
-                particle[0].x += particle[1].x
-                particle[1].x -= math.copysign(1, particle[1].x) * self.air_resistance
+    def expire(self):
+        self.game.extra_points = False
 
-            pygame.draw.rect(display, self.color, particle[0])
+STEP_RATE = 60
+WINDOW_SIZE = (1530, 800)
+MAX_STEPS_PER_FRAME = 5
 
-    def should_destroy(self, window_size_y):
-        for particle in self.particles:
-            if particle[0].y < window_size_y:
-                return False
-        return True
 
 class Game:
-    def __init__(self, WINDOW_SIZE, WINDOW_NAME, ICON_PATH):
-        pygame.init()
+    def __init__(self, WINDOW_SIZE, WINDOW_NAME, ICON_PATH, headless=False, seed=None, dirty_rendering=False, frame_cap=60, adaptive_quality=True, record_scores=True):
+        # Headless games only simulate: no window, no audio, no drawing and no frame cap
+        self.headless = headless
+
+        # Everything random in a session derives from this seed, and time is counted in frames,
+        # so a seed plus the key events replays a session exactly
+        if seed is None:
+            seed = random.getrandbits(32)
+        self.session_seed = seed
+        self.seed = seed
+        self.frame = 0
+        self.replay_events = None
+        # Set to a ReplayRecorder before the first frame to write the session to a replay file on exit.
+        # Key events are only kept while one is attached, so long sessions do not accumulate them.
+        self.recorder = None
+
+        # The simulation always advances in fixed steps of 1/STEP_RATE seconds. Rendering runs at up to
+        # frame_cap frames per second (0 for uncapped) and draws between the last two steps.
+        self.frame_cap = frame_cap
+        self.step_time = 1 / STEP_RATE
+        self.accumulator = 0
+        self.last_update = None
+
+        # Effect budgets shrink when frames take longer than the frame cap allows
+        self.adaptive_quality = adaptive_quality
+        self.quality = QualityGovernor(1000 / (frame_cap or STEP_RATE))
+        if not self.headless:
+            pygame.init()
         pygame.font.init()
         
-        # Loading sfx
-        pygame.mixer.init()
-        self.jump_sfx = pygame.mixer.Sound(r"assets/jump.wav")
-        self.invalidate_sfx = pygame.mixer.Sound(r"assets/invalidate.wav")
-        self.boost_sfx = pygame.mixer.Sound(r"assets/boost.ogg")
-        self.teleport_sfx = pygame.mixer.Sound(r"assets/teleport.wav")
-        self.slow_down_sfx = pygame.mixer.Sound(r"assets/slow_down.wav")
-        self.select_sfx = pygame.mixer.Sound(r"assets/select.wav")
-        self.death_sfx = pygame.mixer.Sound(r"assets/death.wav")
-        self.draw_card_sfx = pygame.mixer.Sound(r"assets/draw_card.ogg")
-        self.rain_sfx = pygame.mixer.Sound(r"assets/rain.ogg")
-        self.revived_sfx = pygame.mixer.Sound(r"assets/revived.ogg")
-        self.bomb_sfx = pygame.mixer.Sound(r"assets/bomb.wav")
-        self.zero_gravity_sfx = pygame.mixer.Sound(r"assets/zero_gravity.wav")
-        self.open_hand_sfx = pygame.mixer.Sound(r"assets/open_hand.ogg")
-        self.close_hand_sfx = pygame.mixer.Sound(r"assets/close_hand.ogg")
-        self.rain_sfx = pygame.mixer.Sound(r"assets/rain.ogg")
-        self.switch_card_sfx = pygame.mixer.Sound(r"assets/switch_card.ogg")
-        self.power_jump_sfx = pygame.mixer.Sound(r"assets/powerJump.wav")
-        self.hit_platform_sfx = pygame.mixer.Sound(r"assets/hit_platform.wav")
-        
-        self.boost_sfx.set_volume(.5)
-        self.invalidate_sfx.set_volume(.2)
-        self.jump_sfx.set_volume(.2)
-        self.teleport_sfx.set_volume(.3)
-        self.zero_gravity_sfx.set_volume(.5)
-        self.power_jump_sfx.set_volume(.2)
-        self.select_sfx.set_volume(.2)
-        self.rain_sfx.set_volume(.3)
-        self.rain_sfx.play(-1)
+        # Sounds and fonts decode on a thread pool while the window opens; death, revived and bomb
+        # only load once they are first played
+        if not self.headless:
+            pygame.mixer.init()
+        self.assets = AssetManager(r"assets/manifest.json", audio=not self.headless)
+        self.jump_sfx = self.assets.sound("jump")
+        self.invalidate_sfx = self.assets.sound("invalidate")
+        self.boost_sfx = self.assets.sound("boost")
+        self.teleport_sfx = self.assets.sound("teleport")
+        self.slow_down_sfx = self.assets.sound("slow_down")
+        self.select_sfx = self.assets.sound("select")
+        self.death_sfx = self.assets.sound("death")
+        self.draw_card_sfx = self.assets.sound("draw_card")
+        self.rain_sfx = self.assets.sound("rain")
+        self.revived_sfx = self.assets.sound("revived")
+        self.bomb_sfx = self.assets.sound("bomb")
+        self.zero_gravity_sfx = self.assets.sound("zero_gravity")
+        self.open_hand_sfx = self.assets.sound("open_hand")
+        self.close_hand_sfx = self.assets.sound("close_hand")
+        self.switch_card_sfx = self.assets.sound("switch_card")
+        self.power_jump_sfx = self.assets.sound("power_jump")
+        self.hit_platform_sfx = self.assets.sound("hit_platform")
 
-        os.environ['SDL_VIDEO_CENTERED'] = '1'
         self.WINDOW_SIZE = WINDOW_SIZE
-        self.display = pygame.display.set_mode(WINDOW_SIZE)
-        pygame.display.set_caption(WINDOW_NAME)
-        icon = pygame.image.load(ICON_PATH)
-        pygame.display.set_icon(icon)
-        self.tDisplay = pygame.Surface(WINDOW_SIZE)
-        self.reshuffle_cost = 5
+        if self.headless:
+            # Nothing is ever drawn in a headless game, so it has no surfaces to draw on
+            self.display = None
+        else:
+            os.environ['SDL_VIDEO_CENTERED'] = '1'
+            self.display = pygame.display.set_mode(WINDOW_SIZE)
+            pygame.display.set_caption(WINDOW_NAME)
+            icon = self.assets.image(ICON_PATH)
+            pygame.display.set_icon(icon)
+        self.rain_sfx.play(-1)
 
+        # With dirty rendering only the regions drawn this frame and last frame are repainted and
+        # sent to the screen; otherwise every frame is a full fill and flip
+        self.renderer = None
+        if dirty_rendering and not self.headless:
+            self.renderer = DirtyRenderer(self.display)
+        self.reshuffle_cost = 5
+        self.world = None
+        self.text_cache = TextCache()
+        self.card_renderer = CardRenderer(self.text_cache)
+        # F3 shows per-phase frame timings; recording is off unless the overlay or an export needs it
+        self.profiler = FrameProfiler()
+        # Simulated and replayed runs never touch the player's high score or run history
+        self.scores = None
+        if record_scores and not self.headless:
+            self.scores = ScoreStore()
+
+        self.setup()
         self.restart()
 
-    def restart(self):
-        self.tDisplay.set_alpha(100)
-        self.tDisplay.fill((50, 50, 50))
+    def setup(self):
+        # Everything that stays the same from run to run: sizes, timings, colors, fonts, card geometry
+        # and the ability catalog. restart() only resets the state of a single run.
         self.clock = pygame.time.Clock()
 
         self.player_size = (20, 40)
-        self.player_character = pygame.Rect(pygame.Vector2(self.WINDOW_SIZE[0]/2 - (self.player_size[0]/2), self.WINDOW_SIZE[1]/2 - (self.player_size[1]/2)), self.player_size)
-        self.player_velocity = pygame.Vector2(0, 0)
-        self.player_jumps = 2
         self.player_jump_force = 10
-        self.player_grounded = False
-        self.player_left = False
-        self.player_right = False
-        self.player_speed = 5
-        self.player_score = 0
-        self.player_final_score = 0
-        self.player_high_score = 0
-
-        # Unlimited Jump Ability
-        self.limit_jumps = True
-        self.unlimited_jump_length = 10 * 1000
-        self.unlimited_jump_endtime = 0
-
-        # Triple Jump
-        self.triple_jump = False
-        self.triple_jump_length = 20 * 1000
-        self.triple_jump_endtime = 0
-
-        # Bomb
-        self.bomb_set = False
 
-        # Jump Boost
-        self.boost_jump = False
-        self.boost_jump_length = 10 * 1000
-        self.boost_jump_endtime = 0
-
-        # Speed Boost
-        self.boost_speed = False
-        self.boost_speed_length = 10 * 1000
-        self.boost_speed_endtime = 0
-
-        # Extra Life
-        self.extra_life = 0
-        self.revive = False
-        self.extra_life_length = 60 * 1000
-        self.extra_life_endtime = 0
-
-        # Gravity
-        self.zero_gravity = False
-        self.zero_gravity_length = 15 * 1000
-        self.zero_gravity_endtime = 0
-
-        # Extra Points
-        self.extra_points = False
-        self.extra_points_length = 30 * 1000
-        self.extra_points_endtime = 0
+        self.unlimited_jump_length = 10 * STEP_RATE
+        self.triple_jump_length = 20 * STEP_RATE
+        self.boost_jump_length = 10 * STEP_RATE
+        self.boost_speed_length = 10 * STEP_RATE
+        self.extra_life_length = 60 * STEP_RATE
+        self.zero_gravity_length = 15 * STEP_RATE
+        self.extra_points_length = 30 * STEP_RATE
 
         self.platform_size = (150, 20)
-        self.platforms = []
-        self.platforms_rects = []
         self.platform_offset = 0.5 * self.player_size[0]
-        self.platforms.append([False, pygame.Rect(pygame.Vector2(self.player_character.x - (self.platform_size[0]/2) + (self.player_character[2]/2), self.player_character.y + self.player_character[3] + 10), self.platform_size)])
-        self.top_platform = self.platforms[0][1]
         self.edge_left = self.platform_size[0]
         self.edge_right = self.WINDOW_SIZE[0] - self.platform_size[0]
-        self.generate_platforms(50)
 
-        self.smoke_particles = []
-        self.rain_particles = []
-        self.rain_splash_particles = []
         self.rain_particle_size = (5, 50)
-        self.particles = []
-
+        # Particle lifetimes in steps; smoke lives a random time in this range and shrinks as it goes
+        self.smoke_lifetime = (40, 70)
+        self.splash_lifetime = 90
+        self.burst_lifetime = 120
         self.initial_camera_speed = 2
         self.max_camera_speed = 4
-        self.camera_speed = 0
-        self.gravity = .4
         self.terminal_gravitational_velocity = 20
 
-        self.game_over = False
-
         self.num_of_cards = 4
         self.draw_margin = 20
-
-        self.abilities = []
-        self.ability_deck = []
-        self.selected_ability = 0
-        self.ability_display = False
         ability_display_size = (0, self.WINDOW_SIZE[1]/9)
         ability_display_size = (ability_display_size[1] * 7, ability_display_size[1])
         ability_display_pos = ((self.WINDOW_SIZE[0]/2) - (ability_display_size[0]/2), self.WINDOW_SIZE[1] - (self.WINDOW_SIZE[1] * .2))
@@ -375,33 +395,54 @@ class Game:
         self.card_size = ((self.ability_display_bar[2] - (self.draw_margin * (self.num_of_cards + 1)))/self.num_of_cards, 0)
         self.card_size = (self.card_size[0], self.card_size[0] * 1.5)
         self.card_font_size = int(self.card_size[0]/16)
-        self.card_font = pygame.font.Font("dogica.ttf", self.card_font_size)
-        self.desc_font = pygame.font.Font("dogica.ttf", int(self.card_font_size * 1.3))
         ability_desc_pos = (ability_display_pos[0] + ability_display_size[0] + (0.05 * ability_display_size[0]), 0)
         self.ability_desc = pygame.Rect(ability_desc_pos, (self.WINDOW_SIZE[0] - ability_desc_pos[0], self.WINDOW_SIZE[1]))
         self.ability_name_position = (self.ability_desc.x + (0.1 * self.ability_desc.w), self.ability_desc.y + (0.1 * self.ability_desc.h))
 
-        self.display_font = pygame.font.Font("Helmet-Regular.ttf", int(self.WINDOW_SIZE[0]/2))
-        self.screen_font = pygame.font.Font("dogica.ttf", int(self.WINDOW_SIZE[0]/30))
-        self.screen_font_small = pygame.font.Font("dogica.ttf", int(self.WINDOW_SIZE[0]/40))
-        self.card_font = pygame.font.Font("dogica.ttf", int(self.card_size[0]/16))
+        # Translucent overlays for the open hand and the game over screen, and the paused world under
+        # either overlay, drawn once per pause by render_paused()
+        self.tDisplay = None
+        self.game_over_overlay = None
+        self.frozen_frame = None
+        self.frozen_key = None
+        if not self.headless:
+            self.tDisplay = pygame.Surface(self.WINDOW_SIZE)
+            self.tDisplay.set_alpha(100)
+            self.tDisplay.fill((50, 50, 50))
+            pygame.draw.rect(self.tDisplay, (0, 0, 0), self.ability_display_bar, 0, 16)
+            pygame.draw.rect(self.tDisplay, (0, 0, 0), self.ability_desc)
+            self.game_over_overlay = pygame.Surface(self.WINDOW_SIZE)
+            self.game_over_overlay.set_alpha(100)
+            self.game_over_overlay.fill((50, 50, 50))
+            back_size = (self.WINDOW_SIZE[0] * .8, self.WINDOW_SIZE[1] * .8)
+            back = (self.WINDOW_SIZE[0]/2 - (back_size[0]/2), self.WINDOW_SIZE[1]/2 - (back_size[1]/2))
+            pygame.draw.rect(self.game_over_overlay, (0, 0, 0), pygame.Rect(back, back_size), 0, 16)
+            self.frozen_frame = pygame.Surface(self.WINDOW_SIZE)
+
+        self.card_font = self.assets.font("dogica.ttf", self.card_font_size)
+        self.desc_font = self.assets.font("dogica.ttf", int(self.card_font_size * 1.3))
+        self.display_font = self.assets.font("Helmet-Regular.ttf", int(self.WINDOW_SIZE[0]/2))
+        self.screen_font = self.assets.font("dogica.ttf", int(self.WINDOW_SIZE[0]/30))
+        self.screen_font_small = self.assets.font("dogica.ttf", int(self.WINDOW_SIZE[0]/40))
+        self.profiler_font = self.assets.font("dogica.ttf", 10)
 
-        # Abilities
+        # Abilities; a card is re-initialized whenever it is drawn, so runs can share the instances
         pos = (0, 0)
         size = (0, 0)
-        self.ability_deck.append(ResetCamera("Eyes of Lahan", "Slows the camera speed down to its initial speed", pos, size, self, 15))
-        self.ability_deck.append(UnlimitedJumps("Sine Terminus", "Gives you unlimited jumps", pos, size, self, 25))
-        self.ability_deck.append(Teleport("Summus's Throne", "Teleports the player to the top platform", pos, size, self, 20))
-        self.ability_deck.append(TripleJump("Jump of Trinus", "Allows the player to triple jump", pos, size, self, 20))
-        self.ability_deck.append(Bomb("Leap of Potentia", "Sends the player flying up", pos, size, self, 50))
-        self.ability_deck.append(TeleportNearestPlatform("Ultimum's Reach", "Teleports the player to the nearest platform above them.", pos, size, self, 5))
-        self.ability_deck.append(JumpBoost("Levo's Boost", "Boosts the player's jump force", pos, size, self, 15))
-        self.ability_deck.append(SpeedBoost("Celerita's Boost", "Boosts the player's speed", pos, size, self, 15))
-        self.ability_deck.append(ExtraLife("Life of Addo", "Lets the player respawn when they die", pos, size, self, 50))
-        self.ability_deck.append(ZeroGravity("Nil Gravitas", "Puts the player in zero gravity space. ", pos, size, self, 25))
-        self.ability_deck.append(Jump("Saltus", "Lets the player jump right now. ", pos, size, self, 5))
-        self.ability_deck.append(ExtraPoints("Addo's Wealth", "Doubles the points the player gains", pos, size, self, 15))
-        self.draw_from_deck(True, False)
+        self.ability_catalog = [
+            ResetCamera("Eyes of Lahan", "Slows the camera speed down to its initial speed", pos, size, self, 15),
+            UnlimitedJumps("Sine Terminus", "Gives you unlimited jumps", pos, size, self, 25),
+            Teleport("Summus's Throne", "Teleports the player to the top platform", pos, size, self, 20),
+            TripleJump("Jump of Trinus", "Allows the player to triple jump", pos, size, self, 20),
+            Bomb("Leap of Potentia", "Sends the player flying up", pos, size, self, 50),
+            TeleportNearestPlatform("Ultimum's Reach", "Teleports the player to the nearest platform above them.", pos, size, self, 5),
+            JumpBoost("Levo's Boost", "Boosts the player's jump force", pos, size, self, 15),
+            SpeedBoost("Celerita's Boost", "Boosts the player's speed", pos, size, self, 15),
+            ExtraLife("Life of Addo", "Lets the player respawn when they die", pos, size, self, 50),
+            ZeroGravity("Nil Gravitas", "Puts the player in zero gravity space. ", pos, size, self, 25),
+            Jump("Saltus", "Lets the player jump right now. ", pos, size, self, 5),
+            ExtraPoints("Addo's Wealth", "Doubles the points the player gains", pos, size, self, 15),
+        ]
 
         self.bg_color = (57, 58, 52)
         self.player_color = (208, 84, 50)
@@ -410,28 +451,94 @@ class Game:
         self.smoke_color = (89, 91, 90)
         self.rain_color = (47, 48, 42)
 
+    def restart(self, seed=None):
+        if seed is not None:
+            self.seed = seed
+        # Gameplay and cosmetic effects draw from separate streams so headless runs match windowed ones
+        self.rng = random.Random(self.seed)
+        self.fx_rng = np.random.default_rng(self.seed ^ 0xFFFFFFFF)
+
+        self.player_character = pygame.Rect(pygame.Vector2(self.WINDOW_SIZE[0]/2 - (self.player_size[0]/2), self.WINDOW_SIZE[1]/2 - (self.player_size[1]/2)), self.player_size)
+        self.player_velocity = pygame.Vector2(0, 0)
+        self.player_jumps = 2
+        self.player_grounded = False
+        self.player_left = False
+        self.player_right = False
+        self.player_speed = 5
+        self.player_score = 0
+        self.player_final_score = 0
+        self.player_high_score = 0
+        self.run_start_frame = self.frame
+        self.abilities_used = []
+
+        # Timed abilities expire on game time, which stands still while the hand is open
+        self.effects = EffectScheduler()
+        self.limit_jumps = True
+        self.triple_jump = False
+        self.bomb_set = False
+        self.boost_jump = False
+        self.boost_speed = False
+        self.extra_life = 0
+        self.revive = False
+        self.zero_gravity = False
+        self.extra_points = False
+
+        self.platforms = PlatformIndex(self.platform_size[1])
+        self.platforms.append(pygame.Rect(pygame.Vector2(self.player_character.x - (self.platform_size[0]/2) + (self.player_character[2]/2), self.player_character.y + self.player_character[3] + 10), self.platform_size))
+        self.top_platform = self.platforms[0]
+        self.top_platform_height = 0
+        if self.world is not None:
+            self.world.stop()
+        self.world = WorldGenerator(self.seed, self.top_platform.x, self.edge_left, self.edge_right, background=not self.headless)
+        while len(self.platforms) < 2 * self.world.chunk_size:
+            self.extend_world()
+
+        # The rain pool grows to fit rain_count; effects make room by retiring their oldest particles
+        # Shrinking smoke goes through every size up to 25 in each of its 21 grays, and one frame can show
+        # most of them, so its sprite cache holds them all
+        self.smoke_particles = ParticleSystem(1024, shrink=True, max_sprites=25 * 21)
+        self.rain_particles = ParticleSystem(4096, "drop")
+        self.rain_splash_particles = ParticleSystem(4096)
+        self.rain_count = 100
+        self.particles = ParticleSystem(4096)
+        self.card_particles = ParticleSystem(1024)  # Not slowed down by self.time
+
+        self.camera_y = 0
+        self.previous_camera_y = 0
+        self.previous_player_position = self.player_character.topleft
+        self.camera_speed = 0
+        self.gravity = .4
+
+        self.game_over = False
+
+        self.abilities = []
+        self.ability_deck = list(self.ability_catalog)
+        self.selected_ability = 0
+        self.ability_display = False
+        self.draw_from_deck(True, False)
+
         self.time = 1
 
-    def generate_platforms(self, platformCount):
-        for i in range(platformCount):
-            random_offset = random.randint(300, 350)
-            position = None
-            if (self.top_platform.x - random_offset) < self.edge_left:
-                position = pygame.Vector2(self.top_platform.x + random_offset, self.top_platform.y - random.randint(200, 250))
-            elif (self.top_platform.x + random_offset) > self.edge_right:
-                position = pygame.Vector2(self.top_platform.x - random_offset, self.top_platform.y - random.randint(200, 250))
-            else:
-                position = pygame.Vector2(self.top_platform.x + (random_offset * random.choice([-1, 1])), self.top_platform.y - random.randint(200, 250))
+    def snapshot(self):
+        # The current run as a replay keyframe, which restore() can bring back any number of times.
+        # Cards are kept by catalog index, so restored hands and decks hold the catalog's own cards.
+        return encode_keyframe(self)
+
+    def restore(self, snapshot):
+        decode_keyframe(self, snapshot)
 
-            self.platforms.append([False, pygame.Rect(pygame.Vector2(position.x, position.y), self.platform_size)])
-            self.top_platform = self.platforms[-1][1]
+    def extend_world(self):
+        for x, height in self.world.pull():
+            self.platforms.append(pygame.Rect(x, self.top_platform.y - (height - self.top_platform_height), self.platform_size[0], self.platform_size[1]))
+            self.top_platform = self.platforms[-1]
+            self.top_platform_height = height
 
     def draw_from_deck(self, specific_index=True, play_sound=True):
         if play_sound:
             for i in range(2):
                 self.draw_card_sfx.play()
         for i in range(self.num_of_cards - len(self.abilities)):
-            random_ability = random.choice(self.ability_deck)
+            random_ability = self.rng.choice(self.ability_deck)
             self.ability_deck.remove(random_ability)
             size = ((self.ability_display_bar[2] - (self.draw_margin * (self.num_of_cards + 1)))/self.num_of_cards, 0)
             size = (size[0], size[0] * 1.5)
@@ -442,10 +549,26 @@ class Game:
             else:
                 self.abilities.append(random_ability)
 
+    def emit_smoke(self, count, spread_y):
+        count = self.quality.budget(count)
+        rand_size = self.fx_rng.integers(10, 25, count, endpoint=True)
+        random_gradient = self.fx_rng.integers(80, 100, count, endpoint=True)
+        position = np.column_stack((self.player_character.x - (20/2) + self.fx_rng.integers(-20, 20, count, endpoint=True), self.player_character.y + self.camera_y + self.player_size[1] - (self.player_size[1]/2) + self.fx_rng.integers(spread_y[0], spread_y[1], count, endpoint=True)))
+        lifetime = self.fx_rng.integers(self.smoke_lifetime[0], self.smoke_lifetime[1], count, endpoint=True)
+        self.smoke_particles.emit(position, (0, -.5), np.column_stack((rand_size, rand_size)), np.repeat(random_gradient[:, None], 3, axis=1), 0.0, lifetime)
+
+    def emit_splashes(self, positions):
+        # Ten droplets per splash at full quality, all droplets of one splash sharing a size
+        droplets = self.quality.budget(10)
+        count = len(positions) * droplets
+        rand_size = np.repeat(self.fx_rng.integers(5, 8, len(positions), endpoint=True), droplets)
+        velocity = np.column_stack((self.fx_rng.integers(-5, 5, count, endpoint=True), self.fx_rng.integers(-8, -5, count, endpoint=True)))
+        self.rain_splash_particles.emit(np.repeat(positions, droplets, axis=0), velocity, np.column_stack((rand_size, rand_size)), self.rain_color, .1, self.splash_lifetime)
+
     def revive_player(self):
         self.revived_sfx.play()
         self.player_velocity.y = 0
-        self.player_character.y = -self.player_size[1]
+        self.player_character.y = -self.player_size[1] - self.camera_y
         self.gravity = 0.05
         self.extra_life -= 1
         self.revive = True
@@ -458,143 +581,217 @@ class Game:
             self.ability_display = False
             self.time = 0
 
-            with open("data.txt") as f:
-                contents = f.read()
-                self.player_high_score = int(contents)
-
-            if self.player_high_score < self.player_final_score:
-                with open("data.txt", "w") as f:
-                    f.write(str(self.player_final_score))
-                self.player_high_score = self.player_final_score
+            if self.scores is not None:
+                self.scores.record_run(self.player_final_score, self.frame - self.run_start_frame, self.seed, self.abilities_used)
+                self.player_high_score = self.scores.high_score
         else:
             self.revive_player()
         self.camera_speed = 0
 
     def process_input(self):
         for event in pygame.event.get():
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    pygame.quit()
-                    sys.exit()
-
-                elif event.key == pygame.K_r:
-                    if self.game_over:
-                        self.select_sfx.play()
-                        self.restart()
-                    elif self.ability_display and self.player_score >= self.reshuffle_cost:
-                        for ability in self.abilities:
-                            ability.selected = False
-                            self.ability_deck.append(ability)
-                        self.abilities.clear()
-                        self.player_score -= self.reshuffle_cost
-                        self.draw_from_deck(False)
-                    elif self.ability_display and self.player_score < self.reshuffle_cost:
-                        self.invalidate_sfx.play()
-
-
-                elif event.key == pygame.K_a:
-                    if 0 <= self.player_velocity.y <= 1:
-                        for i in range(2):
-                            rand_size = random.randint(10, 25)
-                            random_gradient = random.randint(80, 100)
-                            self.smoke_particles.append([pygame.Rect(self.player_character.x - (20/2) + random.randint(-20, 20), self.player_character.y + self.player_size[1] - (self.player_size[1]/2) + random.randint(0, 20), rand_size, rand_size), random_gradient])
-                    self.player_left = True
-
-                elif event.key == pygame.K_d:
-                    if 0 <= self.player_velocity.y <= 1:
-                        for i in range(2):
-                            rand_size = random.randint(10, 25)
-                            random_gradient = random.randint(80, 100)
-                            self.smoke_particles.append([pygame.Rect(self.player_character.x - (20/2) + random.randint(-20, 20), self.player_character.y + self.player_size[1] - (self.player_size[1]/2) + random.randint(0, 20), rand_size, rand_size), random_gradient])
-                    self.player_right = True
-
-                elif event.key == pygame.K_SPACE and self.player_jumps > 0:  # Jumping
-                    if self.camera_speed == 0:
-                        self.camera_speed = self.initial_camera_speed
-                    if 0 <= self.player_velocity.y <= 1:
-                        for i in range(5):
-                            rand_size = random.randint(10, 25)
-                            random_gradient = random.randint(80, 100)
-                            self.smoke_particles.append([pygame.Rect(self.player_character.x - (20/2) + random.randint(-20, 20), self.player_character.y + self.player_size[1] - (self.player_size[1]/2) + random.randint(-20, 0), rand_size, rand_size), random_gradient])
-                    self.player_grounded = False
-
-                    self.player_velocity.y = -self.player_jump_force
-                    if self.boost_jump:
-                        self.player_velocity.y *= 1.5
-
-                    if self.limit_jumps:
-                        self.player_jumps -= 1
-                    self.jump_sfx.play()
-
-                elif event.key == pygame.K_TAB and not self.game_over:
-                    self.ability_display = not self.ability_display
-                    if self.ability_display:
-                        self.rain_sfx.set_volume(0)
-                        self.open_hand_sfx.play()
-                        for key, ability in enumerate(self.abilities):
-                            pos = pygame.Vector2((self.ability_display_bar.x + (self.draw_margin * (key + 1)) + (self.card_size[0] * key), self.ability_display_bar.y - (self.card_size[1]/2)))
-                            ability.__init__(ability.name, ability.description, pos, self.card_size, self, ability.cost)
-                            ability.animation = ability.animate(ability.pos, ability.og_pos, 30)
-                        self.time = 0
-                    else:
+            # The profiler overlay is not part of the game, so it stays out of recordings
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.profiler.toggle_overlay()
+                continue
+            # Keys other than escape are ignored while a recorded log is playing
+            if self.replay_events is not None and event.type in (pygame.KEYDOWN, pygame.KEYUP) and event.key != pygame.K_ESCAPE:
+                continue
+            self.handle_event(event)
+
+    def handle_event(self, event):
+        if self.recorder is not None and event.type in (pygame.KEYDOWN, pygame.KEYUP):
+            self.recorder.log(self.frame, event.type, event.key)
+
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_ESCAPE:
+                self.quit()
+
+            elif event.key == pygame.K_r:
+                if self.game_over:
+                    self.select_sfx.play()
+                    self.restart(self.rng.getrandbits(32))
+                elif self.ability_display and self.player_score >= self.reshuffle_cost:
+                    for ability in self.abilities:
+                        ability.selected = False
+                        self.ability_deck.append(ability)
+                    self.abilities.clear()
+                    self.player_score -= self.reshuffle_cost
+                    self.draw_from_deck(False)
+                elif self.ability_display and self.player_score < self.reshuffle_cost:
+                    self.invalidate_sfx.play()
+
+
+            elif event.key == pygame.K_a:
+                if 0 <= self.player_velocity.y <= 1 and not self.headless:
+                    self.emit_smoke(2, (0, 20))
+                self.player_left = True
+
+            elif event.key == pygame.K_d:
+                if 0 <= self.player_velocity.y <= 1 and not self.headless:
+                    self.emit_smoke(2, (0, 20))
+                self.player_right = True
+
+            elif event.key == pygame.K_SPACE and self.player_jumps > 0:  # Jumping
+                if self.camera_speed == 0:
+                    self.camera_speed = self.initial_camera_speed
+                if 0 <= self.player_velocity.y <= 1 and not self.headless:
+                    self.emit_smoke(5, (-20, 0))
+                self.player_grounded = False
+
+                self.player_velocity.y = -self.player_jump_force
+                if self.boost_jump:
+                    self.player_velocity.y *= 1.5
+
+                if self.limit_jumps:
+                    self.player_jumps -= 1
+                self.jump_sfx.play()
+
+            elif event.key == pygame.K_TAB and not self.game_over:
+                self.ability_display = not self.ability_display
+                if self.ability_display:
+                    self.rain_sfx.set_volume(0)
+                    self.open_hand_sfx.play()
+                    for key, ability in enumerate(self.abilities):
+                        pos = pygame.Vector2((self.ability_display_bar.x + (self.draw_margin * (key + 1)) + (self.card_size[0] * key), self.ability_display_bar.y - (self.card_size[1]/2)))
+                        ability.__init__(ability.name, ability.description, pos, self.card_size, self, ability.cost)
+                        ability.animation = ability.animate(ability.pos, ability.og_pos, 30)
+                    self.time = 0
+                else:
+                    self.rain_sfx.set_volume(.3)
+                    self.close_hand_sfx.play()
+                    self.time = 1
+
+            if event.key == pygame.K_q:
+                self.switch_card_sfx.play()
+                self.abilities[self.selected_ability].selected = False
+                if self.selected_ability - 1 >= 0:
+                    self.selected_ability -= 1
+                else:
+                    self.selected_ability = len(self.abilities) - 1
+
+            elif event.key == pygame.K_e:
+                self.switch_card_sfx.play()
+                self.abilities[self.selected_ability].selected = False
+                if self.selected_ability + 1 < len(self.abilities):
+                    self.selected_ability += 1
+                else:
+                    self.selected_ability = 0
+
+            elif event.key == pygame.K_RETURN:
+                if self.ability_display:
+                    ability = self.abilities[self.selected_ability]
+                    if self.player_score >= ability.cost:
                         self.rain_sfx.set_volume(.3)
-                        self.close_hand_sfx.play()
-                        self.time = 1
+                        self.draw_card_sfx.play()
+                        self.abilities[self.selected_ability].triggered()
+                        self.abilities_used.append(ability.name)
+                        self.player_score -= ability.cost
+                        if not self.headless:
+                            self.card_particles.burst(ability.pos, self.quality.budget(10), (252, 136, 109), (10, 10), (-10, 10), (-10, -5), .06, self.fx_rng, self.burst_lifetime)
+                        self.abilities.remove(ability)
+                        ability.selected = False
+                        self.ability_deck.append(ability)
+                        self.draw_from_deck(True, False)
 
-                if event.key == pygame.K_q:
-                    self.switch_card_sfx.play()
-                    self.abilities[self.selected_ability].selected = False
-                    if self.selected_ability - 1 >= 0:
-                        self.selected_ability -= 1
-                    else:
-                        self.selected_ability = len(self.abilities) - 1
+                        ability = self.abilities[self.selected_ability]
+                        size = ((self.ability_display_bar[2] - (self.draw_margin * (self.num_of_cards + 1)))/self.num_of_cards, 0)
+                        size = (size[0], size[0] * 1.5)
+                        pos = pygame.Vector2((self.ability_display_bar.x + (self.draw_margin * (self.selected_ability + 1)) + (size[0] * self.selected_ability), self.ability_display_bar.y - (size[1]/2)))
+                        ability.__init__(ability.name, ability.description, pos, size, self, ability.cost)
+                        ability.animation = ability.animate(ability.pos, ability.og_pos, 30)
 
-                elif event.key == pygame.K_e:
-                    self.switch_card_sfx.play()
-                    self.abilities[self.selected_ability].selected = False
-                    if self.selected_ability + 1 < len(self.abilities):
-                        self.selected_ability += 1
+                        self.ability_display = False
+                        self.time = 1
                     else:
-                        self.selected_ability = 0
+                        ability.invalidate()
+
+        elif event.type == pygame.KEYUP:
+            if event.key == pygame.K_a:
+                self.player_left = False
+
+            elif event.key == pygame.K_d:
+                self.player_right = False
+
+        elif event.type == pygame.QUIT:
+            self.quit()
+
+    def close(self):
+        # Stops the threads the game owns, for callers that build many games in one process
+        self.world.stop()
+        self.assets.shutdown()
+        if self.scores is not None:
+            self.scores.close()
+            self.scores = None
+
+    def quit(self):
+        if self.recorder is not None:
+            self.recorder.save()
+        self.profiler.close_csv()
+        self.close()
+        pygame.quit()
+        sys.exit()
+
+    def play_inputs(self, input_log):
+        # Queues a recorded input log; from now on only the log drives the game
+        self.replay_events = {}
+        for frame, event_type, key in input_log:
+            self.replay_events.setdefault(frame, []).append(pygame.event.Event(event_type, key=key))
+
+    def tick(self):
+        # One fixed simulation step, after any recorded input for it
+        if self.replay_events is not None:
+            for event in self.replay_events.pop(self.frame, ()):
+                self.handle_event(event)
+        self.profiler.lap("input")
+        self.step()
+        if self.recorder is not None:
+            self.recorder.capture()
 
-                elif event.key == pygame.K_RETURN:
-                    if self.ability_display:
-                        ability = self.abilities[self.selected_ability]
-                        if self.player_score >= ability.cost:
-                            self.rain_sfx.set_volume(.3)
-                            self.draw_card_sfx.play()
-                            self.abilities[self.selected_ability].triggered()
-                            self.player_score -= ability.cost
-                            self.particles.append(Particle(ability.pos, 10, (252, 136, 109), (10, 10), (-10, 10), (-10, -5), .06, self, False))
-                            self.abilities.remove(ability)
-                            ability.selected = False
-                            self.ability_deck.append(ability)
-                            self.draw_from_deck(True, False)
-
-                            ability = self.abilities[self.selected_ability]
-                            size = ((self.ability_display_bar[2] - (self.draw_margin * (self.num_of_cards + 1)))/self.num_of_cards, 0)
-                            size = (size[0], size[0] * 1.5)
-                            pos = pygame.Vector2((self.ability_display_bar.x + (self.draw_margin * (self.selected_ability + 1)) + (size[0] * self.selected_ability), self.ability_display_bar.y - (size[1]/2)))
-                            ability.__init__(ability.name, ability.description, pos, size, self, ability.cost)
-                            ability.animation = ability.animate(ability.pos, ability.og_pos, 30)
-
-                            self.ability_display = False
-                            self.time = 1
-                        else:
-                            ability.invalidate()
+    def update(self):
+        if self.headless:
+            self.tick()
+        else:
+            # Runs as many steps as the time since the last frame covers. After a long stall the
+            # backlog is dropped rather than simulated all at once.
+            now = time.perf_counter()
+            if self.last_update is not None:
+                self.accumulator = min(self.accumulator + now - self.last_update, MAX_STEPS_PER_FRAME * self.step_time)
+            self.last_update = now
+            while self.accumulator >= self.step_time:
+                self.tick()
+                self.accumulator -= self.step_time
+
+            self.render(self.accumulator / self.step_time)
+            self.profiler.lap("render")
+            if self.renderer is not None:
+                self.renderer.present()
+            else:
+                pygame.display.update()
+            self.profiler.lap("present")
 
-            elif event.type == pygame.KEYUP:
-                if event.key == pygame.K_a:
-                    self.player_left = False
+            self.clock.tick(self.frame_cap)
+            if self.adaptive_quality:
+                # get_rawtime() leaves out the time tick() spent waiting for the cap
+                self.quality.observe(self.clock.get_rawtime())
+            self.profiler.lap("wait")
 
-                elif event.key == pygame.K_d:
-                    self.player_right = False
+        if self.profiler.enabled:
+            self.profiler.end(self.frame, self.entity_counts())
 
-            elif event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
+    def particle_systems(self):
+        return (self.rain_particles, self.rain_splash_particles, self.smoke_particles, self.particles, self.card_particles)
+
+    def entity_counts(self):
+        # Live counts, then running totals of particles that expired, were culled or never fit their pool
+        systems = self.particle_systems()
+        live = tuple(len(particles) for particles in systems) + (len(self.platforms),)
+        return live + (sum(particles.expired for particles in systems), sum(particles.culled for particles in systems), sum(particles.dropped for particles in systems))
+
+    def step(self):
+        self.previous_camera_y = self.camera_y
+        self.previous_player_position = self.player_character.topleft
 
-    def update(self):
         if self.player_left:
             self.player_velocity.x = -self.player_speed
 
@@ -610,114 +807,55 @@ class Game:
 
         self.player_character.x += self.player_velocity.x * self.time
         self.player_character.y += self.player_velocity.y * self.time
-
-        self.display.fill(self.bg_color)
-        font_size = self.display_font.size(str(self.player_score))
-        font_position = (self.WINDOW_SIZE[0]/2 - font_size[0]/2, self.WINDOW_SIZE[1]/2 - font_size[1]/2)
-        self.display.blit(self.display_font.render(str(self.player_score), True, self.score_color), font_position)
-
-        if len(self.rain_particles) < 100:
-            for i in range(100 - len(self.rain_particles)):
-                self.rain_particles.append([pygame.Rect(random.randint(0, self.WINDOW_SIZE[0]), random.randint(-2000, -50), self.rain_particle_size[0], self.rain_particle_size[1]), pygame.Vector2(random.uniform(-0.001, 0.001), random.randint(5, 10))])
-        
-        particles_to_remove = []
-        splash_particles_to_remove = []
-        for particle in self.rain_particles:
-            particle[0].y += particle[1].y * self.time
-            particle[0].y += self.camera_speed * self.time
-            particle[0].x += particle[1].x * self.time
-            if particle[0].y >= self.WINDOW_SIZE[1]:
-                particles_to_remove.append(particle)        
-                continue
-            pygame.draw.rect(self.display, (self.rain_color), particle[0])
-
-        for particle in self.rain_splash_particles:
-            # rect, velocity
-            particle[0].y += self.camera_speed * self.time
-            particle[1].y += self.gravity * self.time
-            particle[0].y += particle[1].y * self.time
-            particle[0].x += particle[1].x * self.time
-            particle[1].x -= math.copysign(1, particle[1].x) * 0.1
-            if particle[0].y >= self.WINDOW_SIZE[1]:
-                splash_particles_to_remove.append(particle)
-                continue
-            pygame.draw.rect(self.display, (self.rain_color), particle[0])
-
-        for key, particle in enumerate(particles_to_remove):
-            self.rain_particles.remove(particle)
-
-        for key, particle in enumerate(splash_particles_to_remove):
-            self.rain_splash_particles.remove(particle)
-
-        for part in self.smoke_particles:
-            random_decrease = random.uniform(.00000000000001, .00000000000002)
-            if part[0][2] - random_decrease <= 0:
-                self.smoke_particles.remove(part)
-
-            part = part[0]
-            part[1] -= .5
-            part[2] -= random_decrease
-            part[3] -= random_decrease
-
-        for part in self.smoke_particles:
-            pygame.draw.rect(self.display, (part[1], part[1], part[1]), part[0])
-
+        self.profiler.lap("player")
+
+        # Rain, splashes and smoke are purely cosmetic, so headless games skip them, and they stand
+        # still with everything else while time is stopped
+        if not self.headless and self.time != 0:
+            rain_budget = self.quality.budget(self.rain_count)
+            # Raising rain_count past the pool grows it once, so every drop asked for can be alive
+            self.rain_particles.reserve(rain_budget)
+            missing_rain = rain_budget - len(self.rain_particles)
+            if missing_rain > 0:
+                position = np.column_stack((self.fx_rng.integers(0, self.WINDOW_SIZE[0], missing_rain, endpoint=True), self.fx_rng.integers(-2000, -50, missing_rain, endpoint=True) - self.camera_y))
+                velocity = np.column_stack((self.fx_rng.uniform(-0.001, 0.001, missing_rain), self.fx_rng.integers(5, 10, missing_rain, endpoint=True)))
+                self.rain_particles.emit(position, velocity, self.rain_particle_size, self.rain_color)
+
+            self.rain_particles.update(self.time)
+            self.rain_particles.cull(self.WINDOW_SIZE[1] - self.camera_y)
+            self.rain_splash_particles.update(self.time, self.gravity)
+            self.rain_splash_particles.cull(self.WINDOW_SIZE[1] - self.camera_y, width=self.WINDOW_SIZE[0])
+            # Smoke only rises, so it is gone for good once it leaves the top of the window
+            self.smoke_particles.update(1)
+            self.smoke_particles.cull(self.WINDOW_SIZE[1], 0, self.WINDOW_SIZE[0])
+        self.profiler.lap("weather")
 
         # Platform
-        platforms_to_remove = []
+        # Everything lives in world space; the camera only moves the view, see render()
         if self.time < .5 and self.time != 0:
-            self.player_character.y += self.camera_speed * .5
+            self.camera_y += self.camera_speed * .5
         else:
-            self.player_character.y += self.camera_speed * self.time
-        self.platforms_rects.clear()
-        for platform in self.platforms:
-            if self.time < .5 and self.time != 0:
-                platform[1].y += self.camera_speed * .5
-            else:
-                platform[1].y += self.camera_speed * self.time
-
-            if platform[1].y >= self.WINDOW_SIZE[1]:
-                platforms_to_remove.append(platform)
-                continue
-
-            if len(self.platforms) <= 10:
-                self.generate_platforms(50)
-
-            pygame.draw.rect(self.display, self.platform_color, platform[1])
-            self.platforms_rects.append(platform[1])
-        
-        rain_rects = []
-        rain_rects_to_remove = []
-        for particle in self.rain_particles:
-            rain_rects.append(particle[0])
-
-        for rect in self.platforms_rects:
-            colliding_rain_rect = rect.collidelist(rain_rects)
-            if colliding_rain_rect == -1:
-                continue
-            rand_size = random.randint(5, 8)
-            for i in range(10):
-                random_velocity = pygame.Vector2(random.randint(-5, 5), random.randint(-8, -5))
-                position = pygame.Vector2(rain_rects[colliding_rain_rect].x, rain_rects[colliding_rain_rect].y)
-                self.rain_splash_particles.append([pygame.Rect(position, (rand_size, rand_size)), random_velocity])
-            rain_rects_to_remove.append(colliding_rain_rect)
-
-        colliding_rain_rect = self.player_character.collidelist(rain_rects)
-        if colliding_rain_rect != -1:
-            rand_size = random.randint(5, 8)
-            for i in range(10):
-                random_velocity = pygame.Vector2(random.randint(-5, 5), random.randint(-8, -5))
-                position = pygame.Vector2(rain_rects[colliding_rain_rect].x, rain_rects[colliding_rain_rect].y)
-                self.rain_splash_particles.append([pygame.Rect(position, (rand_size, rand_size)), random_velocity])
-            rain_rects_to_remove.append(colliding_rain_rect)
-
-        for key, rect_index in enumerate(rain_rects_to_remove):
-            del self.rain_particles[rect_index - key]
-
-
-        # Prevents flickering of platforms when it is removed from the list
-        for key, platform in enumerate(platforms_to_remove):
-            self.platforms.remove(platform)
+            self.camera_y += self.camera_speed * self.time
+
+        platforms_to_remove = self.platforms.cull_below(self.WINDOW_SIZE[1] - self.camera_y)
+        # Keep at least a chunk of platforms waiting above the window
+        if len(self.platforms) - self.platforms.split(-self.camera_y) < self.world.chunk_size:
+            self.extend_world()
+        self.profiler.lap("world")
+
+        if not self.headless and self.time != 0:
+            # Each platform and the player stop the first raindrop overlapping them. Rain only
+            # exists between its spawn height and the bottom of the window.
+            rain_platforms = self.platforms.between(-2000 - self.camera_y, self.WINDOW_SIZE[1] - self.camera_y)
+            hits = self.rain_particles.first_hits(rain_platforms + [self.player_character])
+            hits = np.unique(hits[hits != -1])
+            if len(hits):
+                self.emit_splashes(np.trunc(self.rain_particles.pos[hits]))
+                self.rain_particles.kill(hits)
+
+
+        # Platforms that scrolled off the bottom
+        for platform in platforms_to_remove:
             if not self.bomb_set:
                 if self.extra_points:
                     self.player_score += 2
@@ -732,14 +870,15 @@ class Game:
                     self.player_final_score += 1
 
         platforms_to_remove = []
-        platform_colliding = self.player_character.collidelistall(self.platforms_rects)
+        platform_colliding = self.platforms.overlapping(self.player_character)
         if len(platform_colliding) != 0:
             for platform_rect in platform_colliding:
-                platform_pos = pygame.Vector2(self.platforms_rects[platform_rect][0], self.platforms_rects[platform_rect][1])
+                platform_pos = pygame.Vector2(platform_rect.x, platform_rect.y)
                 if self.bomb_set:
                     if self.player_velocity.y < 0:
                         platforms_to_remove.append(platform_rect)
-                        self.particles.append(Particle(platform_pos, 30, self.platform_color, (10, 10), (-10, 10), (-10, -5), .06, self, True))
+                        if not self.headless:
+                            self.particles.burst((platform_pos.x, platform_pos.y + self.camera_y), self.quality.budget(30), self.platform_color, (10, 10), (-10, 10), (-10, -5), .06, self.fx_rng, self.burst_lifetime)
                         self.hit_platform_sfx.play()
                     else:
                         self.camera_speed = self.initial_camera_speed
@@ -762,25 +901,25 @@ class Game:
 
                         self.player_grounded = True
                         self.player_velocity.y = 0
-                        self.player_character.bottom = self.platforms_rects[platform_rect].top
+                        self.player_character.bottom = platform_rect.top
 
                     elif platform_pos.y < self.player_character.y:
-                        self.player_character.top = self.platforms_rects[platform_rect].bottom
+                        self.player_character.top = platform_rect.bottom
                         if not self.zero_gravity:
                             self.player_velocity.y = .5
                 else:
                     if platform_pos.x < self.player_character.x:
-                        self.player_character.left = self.platforms_rects[platform_rect].right
+                        self.player_character.left = platform_rect.right
                         self.player_grounded = False
                     elif platform_pos.x > self.player_character.x:
-                        self.player_character.right = self.platforms_rects[platform_rect].left
+                        self.player_character.right = platform_rect.left
                         self.player_grounded = False
         else:
             self.player_grounded = False
 
 
-        for key, index in enumerate(platforms_to_remove):
-            del self.platforms[index - key]
+        for platform in platforms_to_remove:
+            self.platforms.remove(platform)
             if not self.bomb_set:
                 if self.extra_points:
                     self.player_score += 2
@@ -797,130 +936,215 @@ class Game:
         elif self.camera_speed <= 0:
             self.camera_speed = 0
 
-        pygame.draw.rect(self.display, self.player_color, self.player_character)  # Player
+        self.profiler.lap("collision")
 
         if self.abilities[self.selected_ability].selected == False:
             self.abilities[self.selected_ability].selected = True
 
         if self.ability_display:
-            self.display.blit(self.tDisplay, (0, 0))
-            pygame.draw.rect(self.tDisplay, (0, 0, 0), self.ability_display_bar, 0, 16)
+            for ability in self.abilities:
+                ability.update()
 
-            # Ability description
-            pygame.draw.rect(self.tDisplay, (0, 0, 0), self.ability_desc)
-            ability = self.abilities[self.selected_ability]
-            self.display.blit(self.desc_font.render(f"Title: {ability.name}", True, (255, 255, 255)), self.ability_name_position)
-            desc_position = (self.ability_name_position[0], self.ability_name_position[1] + (0.1 * self.ability_desc.h))
-            lines = []
-            words = ""
-            for word in ability.description.split():
-                if desc_position[0] + self.desc_font.size(words + word)[0] > self.WINDOW_SIZE[0]:
-                    lines.append(words)
-                    words = word + " "
-                    continue
-                else:
-                    words += (word + " ")
-            if words != "":
-                lines.append(words)
+        self.effects.advance(self.time)
 
-            last_desc_position = 0
-            for key, line in enumerate(lines):
-                line_height = self.desc_font.size(line)[1] + 10
-                desc_position = (self.ability_name_position[0], self.ability_name_position[1] + (0.1 * self.ability_desc.h) + (key * line_height))
-                self.display.blit(self.desc_font.render(line, True, (255, 255, 255)), desc_position)
-
-                if key == (len(lines) - 1):
-                    last_desc_position = desc_position
+        if self.zero_gravity:
+            self.camera_speed = abs(self.player_velocity.y) - .5
 
-            self.display.blit(self.desc_font.render(f"Cost: {ability.cost}", True, (255, 255, 255)), (last_desc_position[0], last_desc_position[1] + (0.1 * self.ability_desc.h)))
+        player_screen_y = self.player_character.y + self.camera_y
+        if self.bomb_set and self.player_velocity.y > 0 and player_screen_y >= self.WINDOW_SIZE[1] and not self.game_over:
+            self.end_game()
 
-            for ability in self.abilities:
-                ability.update()
-                ability.render()
+        if player_screen_y >= self.WINDOW_SIZE[1] and not self.bomb_set and not self.game_over: # Player Loses
+            self.end_game()
 
-        if not self.limit_jumps:
-            if pygame.time.get_ticks() >= self.unlimited_jump_endtime:
-                self.limit_jumps = True
+        self.profiler.lap("abilities")
 
-        if self.triple_jump:
-            if pygame.time.get_ticks() >= self.triple_jump_endtime:
-                self.triple_jump = False
+        self.particles.update(self.time, self.gravity)
+        self.particles.cull(self.WINDOW_SIZE[1], width=self.WINDOW_SIZE[0])
+        self.card_particles.update(1, self.gravity)
+        self.card_particles.cull(self.WINDOW_SIZE[1], width=self.WINDOW_SIZE[0])
+        self.profiler.lap("particles")
 
-        if self.boost_jump:
-            if pygame.time.get_ticks() >= self.boost_jump_endtime:
-                self.boost_jump = False
+        self.frame += 1
 
-        if self.boost_speed:
-            if pygame.time.get_ticks() >= self.boost_speed_endtime:
-                self.boost_speed = False
-                self.player_speed /= 1.5
+    def draw_background(self, surface):
+        surface.fill(self.bg_color)
+        score_text = self.text_cache.render(self.display_font, str(self.player_score), True, self.score_color)
+        font_size = score_text.get_size()
+        font_position = (self.WINDOW_SIZE[0]/2 - font_size[0]/2, self.WINDOW_SIZE[1]/2 - font_size[1]/2)
+        surface.blit(score_text, font_position)
+
+    def mark(self, rect):
+        # Records a drawn region for the dirty renderer
+        if self.renderer is not None:
+            self.renderer.mark(rect)
+
+    def render(self, alpha=1):
+        # alpha is how far the frame is from the previous step to the current one
+        if self.ability_display or self.game_over:
+            self.render_paused()
+            return
+        self.frozen_key = None
+
+        dirty_rects = None
+        if self.renderer is not None:
+            self.renderer.set_background((self.bg_color, self.score_color, self.player_score), self.draw_background)
+            self.renderer.begin()
+            dirty_rects = self.renderer.current
+        else:
+            self.draw_background(self.display)
 
-        if self.extra_life > 0:
-            if pygame.time.get_ticks() >= self.extra_life_endtime:
-                self.extra_life = 0
+        self.render_world(alpha, dirty_rects)
+        self.card_particles.render(self.display, 0, dirty_rects)
+        self.render_profiler()
 
-        if self.zero_gravity:
-            if pygame.time.get_ticks() >= self.zero_gravity_endtime:
-                self.camera_speed = self.initial_camera_speed
-                self.zero_gravity = False
-            else:
-                self.camera_speed = abs(self.player_velocity.y) - .5
+    def render_world(self, alpha, dirty_rects=None):
+        # World space to screen space
+        camera_offset = round(self.previous_camera_y + (self.camera_y - self.previous_camera_y) * alpha)
 
-        if self.extra_points:
-            if pygame.time.get_ticks() >= self.extra_points_endtime:
-                self.extra_points = False
+        self.rain_particles.render(self.display, camera_offset, dirty_rects)
+        self.rain_splash_particles.render(self.display, camera_offset, dirty_rects)
+        self.smoke_particles.render(self.display, 0, dirty_rects)
 
-        if self.bomb_set and self.player_velocity.y > 0 and self.player_character.y >= self.WINDOW_SIZE[1] and not self.game_over:
-            self.end_game()
+        for platform in self.platforms.between(-camera_offset, self.WINDOW_SIZE[1] - camera_offset):
+            self.mark(pygame.draw.rect(self.display, self.platform_color, platform.move(0, camera_offset)))
 
-        if self.player_character.y >= self.WINDOW_SIZE[1] and not self.bomb_set and not self.game_over: # Player Loses
-            self.end_game()
+        player_x = self.previous_player_position[0] + (self.player_character.x - self.previous_player_position[0]) * alpha
+        player_y = self.previous_player_position[1] + (self.player_character.y - self.previous_player_position[1]) * alpha
+        player_rect = pygame.Rect(round(player_x), round(player_y) + camera_offset, self.player_size[0], self.player_size[1])
+        self.mark(pygame.draw.rect(self.display, self.player_color, player_rect))  # Player
 
-        if self.player_character.y < -self.player_size[1]:
+        if self.player_character.y + camera_offset < -self.player_size[1]:
             if self.player_velocity.y <= 0:
-                pygame.draw.rect(self.display, (255, 255, 255), pygame.Rect(self.player_character.x, -10, 10, 50), 0, 16)
+                self.mark(pygame.draw.rect(self.display, (255, 255, 255), pygame.Rect(self.player_character.x, -10, 10, 50), 0, 16))
             else:
-                pygame.draw.rect(self.display, (255, 0, 0), pygame.Rect(self.player_character.x, -10, 10, 50), 0, 16)
-
-        for particle in self.particles:
-            particle.render(self.display)
-            if particle.should_destroy(self.WINDOW_SIZE[1]):
-                self.particles.remove(particle)
-
-
-        if self.game_over:
-            self.tDisplay = pygame.Surface(self.WINDOW_SIZE)
-            self.tDisplay.set_alpha(100)
-            self.tDisplay.fill((50, 50, 50))
+                self.mark(pygame.draw.rect(self.display, (255, 0, 0), pygame.Rect(self.player_character.x, -10, 10, 50), 0, 16))
+
+        self.particles.render(self.display, 0, dirty_rects)
+
+    def render_paused(self):
+        # Time stands still behind the hand and the game over screen, so the world, the dimmed overlay
+        # and any static text are composited into frozen_frame once. Later frames start from that
+        # frame and only draw the cards, the description and card particles over it.
+        key = (self.ability_display, self.game_over, self.player_score, self.player_final_score, self.player_high_score)
+        if key != self.frozen_key:
+            self.draw_background(self.display)
+            self.render_world(1)
+            if self.ability_display:
+                self.display.blit(self.tDisplay, (0, 0))
+            if self.game_over:
+                self.render_game_over()
+            self.frozen_frame.blit(self.display, (0, 0))
+            self.frozen_key = key
+            if self.renderer is not None:
+                self.renderer.set_background(("frozen", self.frame) + key, lambda background: background.blit(self.frozen_frame, (0, 0)))
+
+        dirty_rects = None
+        if self.renderer is not None:
+            self.renderer.begin()
+            dirty_rects = self.renderer.current
+        else:
+            self.display.blit(self.frozen_frame, (0, 0))
 
-            top_text = "PLATFORMS TRAVERSED:"
-            bot_text = "Press 'R' to Restart"
-            most_bot_text = f"HIGHEST PEAK: {self.player_high_score}"
-            mid = (self.WINDOW_SIZE[0]/2 - (self.screen_font.size(str(self.player_score))[0]/2), self.WINDOW_SIZE[1]/2 - (self.screen_font.size(str(self.player_score))[0]/2))
-            top = (self.WINDOW_SIZE[0]/2 - (self.screen_font.size(top_text)[0]/2), mid[1] - self.screen_font.size(top_text)[1] - (0.1 * self.WINDOW_SIZE[1]))
-            bot = (self.WINDOW_SIZE[0]/2 - (self.screen_font.size(bot_text)[0]/2), mid[1] + self.screen_font.size(bot_text)[1] + (0.1 * self.WINDOW_SIZE[1]))
-            most_bot = (self.WINDOW_SIZE[0]/2 - (self.screen_font_small.size(most_bot_text)[0]/2), bot[1] + self.screen_font.size(most_bot_text)[1] + (0.1 * self.WINDOW_SIZE[1]))
+        if self.ability_display:
+            # Ability description
+            ability = self.abilities[self.selected_ability]
+            self.mark(self.display.blit(self.text_cache.render(self.desc_font, f"Title: {ability.name}", True, (255, 255, 255)), self.ability_name_position))
+            lines = self.card_renderer.wrap(self.desc_font, ability.description, self.WINDOW_SIZE[0] - self.ability_name_position[0])
 
-            back_size = (self.WINDOW_SIZE[0] * .8, self.WINDOW_SIZE[1] * .8)
-            back = (self.WINDOW_SIZE[0]/2 - (back_size[0]/2), self.WINDOW_SIZE[1]/2 - (back_size[1]/2))
-            pygame.draw.rect(self.tDisplay, (0, 0, 0), pygame.Rect(back, back_size), 0, 16)
-            self.display.blit(self.tDisplay, (0, 0))
-            self.display.blit(self.screen_font.render(str(self.player_final_score), True, (255, 255, 255)), mid)
-            self.display.blit(self.screen_font.render(top_text, True, (255, 255, 255)), top)
-            self.display.blit(self.screen_font.render(bot_text, True, (255, 255, 255)), bot)
-            self.display.blit(self.screen_font_small.render(most_bot_text, True, (255, 255, 255)), most_bot)
+            last_desc_position = 0
+            for key, line in enumerate(lines):
+                line_height = self.text_cache.size(self.desc_font, line)[1] + 10
+                desc_position = (self.ability_name_position[0], self.ability_name_position[1] + (0.1 * self.ability_desc.h) + (key * line_height))
+                self.mark(self.display.blit(self.text_cache.render(self.desc_font, line, True, (255, 255, 255)), desc_position))
 
+                if key == (len(lines) - 1):
+                    last_desc_position = desc_position
 
-        pygame.display.update()
+            self.mark(self.display.blit(self.text_cache.render(self.desc_font, f"Cost: {ability.cost}", True, (255, 255, 255)), (last_desc_position[0], last_desc_position[1] + (0.1 * self.ability_desc.h))))
 
-        self.clock.tick(60)
+            for ability in self.abilities:
+                ability.render()
 
+        self.card_particles.render(self.display, 0, dirty_rects)
+        self.render_profiler()
+
+    def render_game_over(self):
+        top_text = "PLATFORMS TRAVERSED:"
+        bot_text = "Press 'R' to Restart"
+        most_bot_text = f"HIGHEST PEAK: {self.player_high_score}"
+        text = self.text_cache
+        mid = (self.WINDOW_SIZE[0]/2 - (text.size(self.screen_font, str(self.player_score))[0]/2), self.WINDOW_SIZE[1]/2 - (text.size(self.screen_font, str(self.player_score))[0]/2))
+        top = (self.WINDOW_SIZE[0]/2 - (text.size(self.screen_font, top_text)[0]/2), mid[1] - text.size(self.screen_font, top_text)[1] - (0.1 * self.WINDOW_SIZE[1]))
+        bot = (self.WINDOW_SIZE[0]/2 - (text.size(self.screen_font, bot_text)[0]/2), mid[1] + text.size(self.screen_font, bot_text)[1] + (0.1 * self.WINDOW_SIZE[1]))
+        most_bot = (self.WINDOW_SIZE[0]/2 - (text.size(self.screen_font_small, most_bot_text)[0]/2), bot[1] + text.size(self.screen_font, most_bot_text)[1] + (0.1 * self.WINDOW_SIZE[1]))
+
+        self.display.blit(self.game_over_overlay, (0, 0))
+        self.display.blit(text.render(self.screen_font, str(self.player_final_score), True, (255, 255, 255)), mid)
+        self.display.blit(text.render(self.screen_font, top_text, True, (255, 255, 255)), top)
+        self.display.blit(text.render(self.screen_font, bot_text, True, (255, 255, 255)), bot)
+        self.display.blit(text.render(self.screen_font_small, most_bot_text, True, (255, 255, 255)), most_bot)
+
+    def render_profiler(self):
+        if self.profiler.overlay:
+            self.mark(self.display.blit(self.profiler.render_overlay(self.profiler_font), (10, 10)))
 
     def run(self):
-        self.process_input()
+        if not self.headless:
+            self.process_input()
         self.update()
 
-game = Game((1530, 800), "Salio's Clamber", r"salios_logo.png")
+    def simulate(self, frames):
+        # Steps a headless game as fast as possible, feeding any queued input log
+        for i in range(frames):
+            self.update()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--headless", type=int, metavar="FRAMES", help="simulate FRAMES frames without a window and print the final score")
+    parser.add_argument("--seed", type=int, help="seed for the session")
+    parser.add_argument("--record", metavar="PATH", help="save a replay of the session to PATH on exit")
+    parser.add_argument("--replay", metavar="PATH", help="play back a recorded session")
+    parser.add_argument("--dirty-rects", action="store_true", help="only repaint the parts of the window that changed")
+    parser.add_argument("--asset-timings", action="store_true", help="print the time to first frame and how long each asset took to load")
+    parser.add_argument("--profile-csv", metavar="PATH", help="record per-phase frame timings of every frame and write them to PATH")
+    parser.add_argument("--fixed-quality", action="store_true", help="always draw effects at full quality")
+    parser.add_argument("--fps", type=int, default=60, help=f"frame rate cap, 0 for uncapped; the simulation always runs at {STEP_RATE} steps per second")
+    args = parser.parse_args()
+
+    seed = args.seed
+    replay = None
+    if args.replay is not None:
+        replay = Replay(args.replay)
+        seed = replay.seed
+
+    if args.headless is not None:
+        game = Game(WINDOW_SIZE, "Salio's Clamber", r"salios_logo.png", True, seed)
+        if replay is not None:
+            game.play_inputs(replay.input_log())
+        if args.profile_csv is not None:
+            game.profiler.start_csv(args.profile_csv)
+        start = time.perf_counter()
+        game.simulate(args.headless)
+        elapsed = time.perf_counter() - start
+        print(f"Simulated {args.headless} frames in {elapsed:.2f}s ({args.headless / elapsed:.0f} fps), score {game.player_final_score}")
+        game.profiler.close_csv()
+        sys.exit()
+
+    start = time.perf_counter()
+    game = Game(WINDOW_SIZE, "Salio's Clamber", r"salios_logo.png", seed=seed, dirty_rendering=args.dirty_rects, frame_cap=args.fps, adaptive_quality=not args.fixed_quality, record_scores=replay is None)
+    if args.record is not None:
+        game.recorder = ReplayRecorder(game, args.record)
+    if args.profile_csv is not None:
+        game.profiler.start_csv(args.profile_csv)
+    if replay is not None:
+        game.play_inputs(replay.input_log())
 
-while True:
     game.run()
+    if args.asset_timings:
+        print(f"First frame after {(time.perf_counter() - start) * 1000:.0f} ms")
+        print(game.assets.report())
+
+    while True:
+        game.run()
@@ -0,0 +1,122 @@
+import argparse
+import timeit
+import tracemalloc
+from types import SimpleNamespace
+
+import pygame
+
+from main import WINDOW_SIZE, Ability, Tween
+from particles import ParticleSystem
+
+
+# Compares the memory and attribute access cost of the entity records with the layouts they replaced:
+# platforms as [False, Rect] lists, particles as [Rect, Vector2] lists, tweens as 7-element lists and
+# cards as dict-backed objects
+
+
+class DictCard:
+    # A card as it was before Ability had slots, colors and all
+    def __init__(self, name, description, pos, size, game, cost):
+        self.name = name
+        self.description = description
+        self.cost = cost
+        self.size = size
+        self.og_pos = pos
+        self.pos = pygame.Vector2(game.WINDOW_SIZE[0]/2, game.WINDOW_SIZE[1])
+        self.game = game
+        self.velocity = pygame.Vector2(0, 0)
+        self.animation = None
+        self.selected = False
+        self.selected_color = (252, 136, 109)
+        self.normal_color = (232, 116, 89)
+        self.color = self.normal_color
+        self.invalid_color = (255, 106, 79)
+        self.invalid = False
+        self.invalid_count = 0
+        self.invalid_length = 8
+
+
+def list_tween(start, end, duration):
+    full_speed = pygame.Vector2((end.x - start.x)/(duration * 0.8), (end.y - start.y)/(duration * 0.8))
+    return [full_speed, full_speed/(duration * 0.2), duration * 0.2, duration * 0.8, 0, duration, end]
+
+
+def step_list_tweens(tweens):
+    for tween in tweens:
+        if tween[4] < tween[5]:
+            tween[4] += 1
+        else:
+            tween[4] = 0
+
+
+def step_tweens(tweens):
+    for tween in tweens:
+        if tween.elapsed < tween.duration:
+            tween.elapsed += 1
+        else:
+            tween.elapsed = 0
+
+
+def particle_pool(count):
+    particles = ParticleSystem(count)
+    for i in range(count):
+        particles.emit([(i, i)], (0, 5), (5, 5), (47, 48, 42))
+    return particles
+
+
+def traced_bytes(build):
+    # Memory still allocated once build() has returned, with the result kept alive
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare memory per entity and attribute access against the old list layouts")
+    parser.add_argument("--count", type=int, default=10_000, help="entities of each kind")
+    args = parser.parse_args()
+    count = args.count
+
+    game = SimpleNamespace(WINDOW_SIZE=WINDOW_SIZE)
+    start = pygame.Vector2(0, 0)
+    end = pygame.Vector2(100, -30)
+    layouts = [
+        ("platform", lambda: [[False, pygame.Rect(i, -i, 150, 20)] for i in range(count)],
+                     lambda: [pygame.Rect(i, -i, 150, 20) for i in range(count)]),
+        ("particle", lambda: [[pygame.Rect(i, i, 5, 5), pygame.Vector2(0, 5)] for i in range(count)],
+                     lambda: particle_pool(count)),
+        ("tween", lambda: [list_tween(start, end, 30) for i in range(count)],
+                  lambda: [Tween(start, end, 30) for i in range(count)]),
+        ("card", lambda: [DictCard("Saltus", "Jump", start, (80, 120), game, 5) for i in range(count)],
+                 lambda: [Ability("Saltus", "Jump", start, (80, 120), game, 5) for i in range(count)]),
+    ]
+
+    print(f"{count} entities of each kind, bytes per entity")
+    print(f"{'entity':<10}{'before':>10}{'after':>10}{'change':>10}")
+    for name, before, after in layouts:
+        old = traced_bytes(before) / count
+        new = traced_bytes(after) / count
+        print(f"{name:<10}{old:10.1f}{new:10.1f}{new / old - 1:+10.1%}")
+
+    # The reads and writes the hot loops make
+    platforms = [[False, pygame.Rect(i, -i, 150, 20)] for i in range(count)]
+    rects = [platform[1] for platform in platforms]
+    tweens = [list_tween(start, end, 30) for i in range(count)]
+    records = [Tween(start, end, 30) for i in range(count)]
+    accesses = [
+        ("platform y", lambda: [platform[1].y for platform in platforms], lambda: [platform.y for platform in rects]),
+        ("tween step", lambda: step_list_tweens(tweens), lambda: step_tweens(records)),
+    ]
+    print()
+    print(f"{'access':<12}{'before us':>10}{'after us':>10}")
+    for name, before, after in accesses:
+        old = min(timeit.repeat(before, number=10, repeat=5)) / 10 * 1e6
+        new = min(timeit.repeat(after, number=10, repeat=5)) / 10 * 1e6
+        print(f"{name:<12}{old:10.0f}{new:10.0f}")
+
+
+if __name__ == "__main__":
+    main()
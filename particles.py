@@ -0,0 +1,233 @@
+from collections import OrderedDict
+
+import numpy as np
+import pygame
+
+
+class ParticleSystem:
+    # Struct-of-arrays particle storage in preallocated pools. The live particles are the first count
+    # rows of each array: emit() fills the rows after them and dead particles are compacted away in
+    # place, so steady gameplay never grows or reallocates the arrays. When the pool is full, overflow
+    # decides what gives: "drop" discards the new particles, "recycle" frees the oldest ones instead.
+    # Particles die when their lifetime runs out in update() or when cull() finds them outside the
+    # visible area; with shrink they get smaller as they age. At most max_sprites sprites are cached,
+    # the least recently used going first.
+    def __init__(self, capacity=4096, overflow="recycle", shrink=False, max_sprites=256):
+        if overflow not in ("drop", "recycle"):
+            raise ValueError(f"unknown overflow policy {overflow!r}")
+        self.capacity = capacity
+        self.overflow = overflow
+        self.shrink = shrink
+        self.max_sprites = max_sprites
+        self.count = 0
+
+        # Running totals of particles removed for each reason
+        self.dropped = 0
+        self.expired = 0
+        self.culled = 0
+
+        self.pos_pool = np.empty((capacity, 2))
+        self.vel_pool = np.empty((capacity, 2))
+        self.size_pool = np.empty((capacity, 2), dtype=np.int32)
+        self.color_pool = np.empty((capacity, 3), dtype=np.int32)
+        self.drag_pool = np.empty(capacity)
+        self.life_pool = np.empty(capacity)
+        self.lifetime_pool = np.empty(capacity)
+
+        self.sprites = OrderedDict()
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def pos(self):
+        return self.pos_pool[:self.count]
+
+    @property
+    def vel(self):
+        return self.vel_pool[:self.count]
+
+    @property
+    def size(self):
+        return self.size_pool[:self.count]
+
+    @property
+    def color(self):
+        return self.color_pool[:self.count]
+
+    @property
+    def drag(self):
+        return self.drag_pool[:self.count]
+
+    @property
+    def life(self):
+        return self.life_pool[:self.count]
+
+    @property
+    def lifetime(self):
+        return self.lifetime_pool[:self.count]
+
+    def pools(self):
+        return (self.pos_pool, self.vel_pool, self.size_pool, self.color_pool, self.drag_pool, self.life_pool, self.lifetime_pool)
+
+    def emit(self, pos, vel, size, color, drag=0.0, lifetime=np.inf):
+        # pos and vel are (n, 2) arrays; size, color, drag and lifetime (in steps) may be shared by the whole batch
+        pos = np.asarray(pos, dtype=float).reshape(-1, 2)
+        total = len(pos)
+        vel = np.broadcast_to(np.asarray(vel, dtype=float), (total, 2))
+        size = np.broadcast_to(np.asarray(size, dtype=np.int32), (total, 2))
+        color = np.broadcast_to(np.asarray(color, dtype=np.int32), (total, 3))
+        drag = np.broadcast_to(np.asarray(drag, dtype=float), total)
+        lifetime = np.broadcast_to(np.asarray(lifetime, dtype=float), total)
+
+        free = self.capacity - self.count
+        if self.overflow == "drop":
+            first, last = 0, min(total, free)
+        else:
+            first, last = max(0, total - self.capacity), total
+            self.discard_oldest(last - first - free)
+        self.dropped += total - (last - first)
+        if first == last:
+            return
+
+        start = self.count
+        self.count += last - first
+        self.pos_pool[start:self.count] = pos[first:last]
+        self.vel_pool[start:self.count] = vel[first:last]
+        self.size_pool[start:self.count] = size[first:last]
+        self.color_pool[start:self.count] = color[first:last]
+        self.drag_pool[start:self.count] = drag[first:last]
+        self.life_pool[start:self.count] = lifetime[first:last]
+        self.lifetime_pool[start:self.count] = lifetime[first:last]
+
+    def reserve(self, capacity):
+        # Grows the pools to hold at least capacity particles, keeping the live ones. Meant for when a
+        # budget is raised, not for every frame.
+        if capacity <= self.capacity:
+            return
+        for name in ("pos_pool", "vel_pool", "size_pool", "color_pool", "drag_pool", "life_pool", "lifetime_pool"):
+            pool = getattr(self, name)
+            grown = np.empty((capacity,) + pool.shape[1:], dtype=pool.dtype)
+            grown[:self.count] = pool[:self.count]
+            setattr(self, name, grown)
+        self.capacity = capacity
+
+    def discard_oldest(self, count):
+        # Makes room by dropping the count particles emitted longest ago
+        if count <= 0:
+            return
+        self.dropped += count
+        remaining = self.count - count
+        for pool in self.pools():
+            pool[:remaining] = pool[count:self.count]
+        self.count = remaining
+
+    def burst(self, pos, count, color, size, spread_range_x, spread_range_y, drag, rng, lifetime=np.inf):
+        vel = np.column_stack((rng.integers(spread_range_x[0], spread_range_x[1], count, endpoint=True),
+                               rng.integers(spread_range_y[0], spread_range_y[1], count, endpoint=True)))
+        self.emit(np.tile((pos[0], pos[1]), (count, 1)), vel, size, color, drag, lifetime)
+
+    def update(self, dt, gravity=0.0):
+        if not self.count:
+            return
+
+        pos = self.pos
+        vel = self.vel
+        vel[:, 1] += gravity * dt
+        pos += vel * dt
+        vel[:, 0] -= np.copysign(self.drag, vel[:, 0]) * dt
+
+        life = self.life
+        life -= dt
+        alive = life > 0
+        if not alive.all():
+            self.expired += self.count - int(alive.sum())
+            self.keep(alive)
+
+    def keep(self, mask):
+        # Compacts the particles where mask is True to the front of the pools, keeping their order
+        alive = np.flatnonzero(mask)
+        if len(alive) == self.count:
+            return
+        for pool in self.pools():
+            pool[:len(alive)] = pool[alive]
+        self.count = len(alive)
+
+    def kill(self, indices):
+        mask = np.ones(self.count, dtype=bool)
+        mask[indices] = False
+        self.keep(mask)
+
+    def cull(self, bottom, top=None, width=None):
+        # Removes particles whose top has reached bottom and, when given, particles entirely above top
+        # or entirely outside 0 <= x < width. Systems that can fall back into view leave out top.
+        if not self.count:
+            return
+        alive = self.pos[:, 1] < bottom
+        if top is not None:
+            alive &= self.pos[:, 1] + self.size[:, 1] > top
+        if width is not None:
+            alive &= (self.pos[:, 0] + self.size[:, 0] > 0) & (self.pos[:, 0] < width)
+        if not alive.all():
+            self.culled += self.count - int(alive.sum())
+            self.keep(alive)
+
+    def clear(self):
+        self.count = 0
+
+    def first_hits(self, rects):
+        # Index of the first particle overlapping each (x, y, w, h) rect, or -1 when none does
+        rects = np.asarray(rects, dtype=float).reshape(-1, 4)
+        if not len(self.pos) or not len(rects):
+            return np.full(len(rects), -1)
+
+        left = self.pos[:, 0, None]
+        top = self.pos[:, 1, None]
+        overlap = ((left < rects[:, 0] + rects[:, 2]) & (left + self.size[:, 0, None] > rects[:, 0]) &
+                   (top < rects[:, 1] + rects[:, 3]) & (top + self.size[:, 1, None] > rects[:, 1]))
+        first = overlap.argmax(axis=0)
+        return np.where(overlap[first, np.arange(len(rects))], first, -1)
+
+    def sprite(self, key):
+        sprite = self.sprites.get(key)
+        if sprite is not None:
+            self.sprites.move_to_end(key)
+            return sprite
+        if len(self.sprites) >= self.max_sprites:
+            # The sprite used longest ago goes; the cache is rebuilt as needed
+            self.sprites.popitem(last=False)
+        sprite = pygame.Surface(key[:2])
+        sprite.fill(key[2:])
+        self.sprites[key] = sprite
+        return sprite
+
+    def render(self, display, offset_y=0, dirty_rects=None):
+        # dirty_rects, when given, collects the rect of every particle drawn
+        if not len(self.pos):
+            return
+
+        # Only particles inside the display are blitted
+        top = self.pos[:, 1] + offset_y
+        visible = (top + self.size[:, 1] > 0) & (top < display.get_height())
+        if not visible.any():
+            return
+
+        positions = np.rint(self.pos[visible] + (0, offset_y)).astype(np.int32).tolist()
+        # Pack size and color into one integer so particles can be grouped by sprite cheaply
+        size = self.size[visible].astype(np.int64)
+        if self.shrink:
+            size = np.ceil(size * (self.life[visible] / self.lifetime[visible])[:, None]).astype(np.int64)
+        color = self.color[visible].astype(np.int64)
+        packed = (size[:, 0] << 40) | (size[:, 1] << 24) | (color[:, 0] << 16) | (color[:, 1] << 8) | color[:, 2]
+        keys, sprite_indices = np.unique(packed, return_inverse=True)
+        sprites = [self.sprite(((key >> 40) & 0xFFFF, (key >> 24) & 0xFFFF, (key >> 16) & 0xFF, (key >> 8) & 0xFF, key & 0xFF)) for key in keys.tolist()]
+        if len(sprites) == 1:
+            sprite = sprites[0]
+            blit_sequence = [(sprite, position) for position in positions]
+        else:
+            blit_sequence = [(sprites[index], position) for index, position in zip(sprite_indices.ravel().tolist(), positions)]
+
+        if dirty_rects is None:
+            display.blits(blit_sequence, False)
+        else:
+            dirty_rects.extend(display.blits(blit_sequence, True))
@@ -0,0 +1,147 @@
+import csv
+import time
+
+import numpy as np
+import pygame
+
+
+PHASES = ("input", "player", "weather", "world", "collision", "abilities", "particles", "render", "present", "wait")
+COUNTERS = ("rain", "splash", "smoke", "particles", "cards", "platforms", "expired", "culled", "dropped")
+
+
+class FrameProfiler:
+    # Per-phase frame timings and entity counts in fixed-size ring buffers. A phase is the time
+    # since the previous lap() of the frame and end() closes the frame, so the phases add up to
+    # the whole frame. Nothing is recorded while disabled and lap() returns straight away.
+    def __init__(self, phases=PHASES, counters=COUNTERS, capacity=1024):
+        self.phases = phases
+        self.counters = counters
+        self.phase_index = {phase: index for index, phase in enumerate(phases)}
+        self.capacity = capacity
+
+        self.frames = np.zeros(capacity, dtype=np.int64)
+        self.times = np.zeros((capacity, len(phases)), dtype=np.int64)
+        self.counts = np.zeros((capacity, len(counters)), dtype=np.int64)
+        self.next = 0
+        self.filled = 0
+
+        self.current = [0] * len(phases)
+        self.last = 0
+        # Samples are taken while either a caller has asked to record, for a CSV export say, or the
+        # overlay is up; enabled is whether either of them currently needs them
+        self.recording = False
+        self.enabled = False
+
+        # Set while start_csv() streams frames to a file
+        self.csv_file = None
+        self.csv_writer = None
+        self.csv_start = 0
+
+        self.overlay = False
+        self.overlay_surface = None
+        self.overlay_refresh = 30
+        self.overlay_age = 0
+
+    def enable(self):
+        self.recording = True
+        self.update_enabled()
+
+    def disable(self):
+        self.recording = False
+        self.update_enabled()
+
+    def toggle_overlay(self):
+        # Hiding the overlay only stops sampling when nothing else is recording
+        self.overlay = not self.overlay
+        self.overlay_surface = None
+        self.update_enabled()
+
+    def update_enabled(self):
+        enabled = self.recording or self.overlay
+        if enabled and not self.enabled:
+            self.current = [0] * len(self.phases)
+            self.last = time.perf_counter_ns()
+        self.enabled = enabled
+
+    def lap(self, phase):
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        self.current[self.phase_index[phase]] += now - self.last
+        self.last = now
+
+    def end(self, frame, counts):
+        # Callers check enabled first, so counting entities costs nothing while disabled
+        row = self.next
+        self.frames[row] = frame
+        self.times[row] = self.current
+        self.counts[row] = counts
+        self.next = (row + 1) % self.capacity
+        self.filled = min(self.filled + 1, self.capacity)
+        if self.next == 0 and self.csv_writer is not None:
+            self.write_csv_rows(self.capacity)
+
+        self.current = [0] * len(self.phases)
+        self.last = time.perf_counter_ns()
+
+    def ordered(self, buffer):
+        # Rows of a ring buffer from oldest to newest
+        if self.filled < self.capacity:
+            return buffer[:self.filled]
+        return np.roll(buffer, -self.next, axis=0)
+
+    def percentiles(self, q=(50, 99)):
+        # {phase: [milliseconds at each percentile in q]}, with "frame" for the whole frame
+        times = self.ordered(self.times)
+        if not len(times):
+            return {}
+        columns = np.column_stack((times, times.sum(axis=1))) / 1e6
+        values = np.percentile(columns, q, axis=0)
+        return {phase: values[:, index].tolist() for index, phase in enumerate(self.phases + ("frame",))}
+
+    def start_csv(self, path):
+        # Records from now on and writes every frame to path, a buffer's worth each time the ring
+        # buffer wraps and the rest on close_csv(), so the file covers the whole session
+        self.csv_file = open(path, "w", newline="")
+        self.csv_writer = csv.writer(self.csv_file)
+        self.csv_writer.writerow(("frame",) + tuple(f"{phase}_ms" for phase in self.phases) + self.counters)
+        self.csv_start = self.next
+        self.enable()
+
+    def write_csv_rows(self, stop):
+        rows = slice(self.csv_start, stop)
+        for frame, times, counts in zip(self.frames[rows].tolist(), (self.times[rows] / 1e6).tolist(), self.counts[rows].tolist()):
+            self.csv_writer.writerow([frame] + [f"{value:.4f}" for value in times] + counts)
+        self.csv_start = stop % self.capacity
+
+    def close_csv(self):
+        if self.csv_writer is None:
+            return
+        self.write_csv_rows(self.next)
+        self.csv_file.close()
+        self.csv_file = None
+        self.csv_writer = None
+        self.disable()
+
+    def render_overlay(self, font):
+        # The overlay text is rebuilt every overlay_refresh frames rather than every frame
+        self.overlay_age -= 1
+        if self.overlay_surface is not None and self.overlay_age > 0:
+            return self.overlay_surface
+        self.overlay_age = self.overlay_refresh
+
+        lines = [f"{'phase':<10}{'p50':>8}{'p99':>8}"]
+        for phase, (p50, p99) in self.percentiles().items():
+            lines.append(f"{phase:<10}{p50:8.2f}{p99:8.2f}")
+        if self.filled:
+            latest = self.counts[(self.next - 1) % self.capacity].tolist()
+            lines.extend(f"{counter:<10}{count:>16}" for counter, count in zip(self.counters, latest))
+
+        line_height = font.get_linesize() + 4
+        width = max(font.size(line)[0] for line in lines) + 20
+        surface = pygame.Surface((width, line_height * len(lines) + 20))
+        surface.fill((0, 0, 0))
+        for index, line in enumerate(lines):
+            surface.blit(font.render(line, True, (255, 255, 255)), (10, 10 + index * line_height))
+        self.overlay_surface = surface
+        return surface
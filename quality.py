@@ -0,0 +1,57 @@
+from collections import deque
+
+
+QUALITY_LEVELS = (1.0, .75, .5, .3, .15)
+
+
+class QualityGovernor:
+    # Scales effect budgets to hold a frame time target. Quality drops a level as soon as the average
+    # frame time over a window runs past the target, but only comes back once frames have stayed well
+    # under it for restore_after frames in a row. After every change the window starts over, so each
+    # level is judged on its own frames and the scale settles instead of oscillating.
+    def __init__(self, target_ms, levels=QUALITY_LEVELS, window=60, degrade_above=1.1, restore_below=.7, restore_after=180):
+        self.target_ms = target_ms
+        self.levels = levels
+        self.degrade_above = degrade_above
+        self.restore_below = restore_below
+        self.restore_after = restore_after
+
+        self.samples = deque(maxlen=window)
+        self.total = 0
+        self.level = 0
+        self.calm_frames = 0
+
+    @property
+    def scale(self):
+        return self.levels[self.level]
+
+    def observe(self, frame_ms):
+        if len(self.samples) == self.samples.maxlen:
+            self.total -= self.samples[0]
+        self.samples.append(frame_ms)
+        self.total += frame_ms
+
+        if frame_ms < self.target_ms * self.restore_below:
+            self.calm_frames += 1
+        else:
+            self.calm_frames = 0
+
+        if len(self.samples) < self.samples.maxlen:
+            return
+        average = self.total / len(self.samples)
+        if average > self.target_ms * self.degrade_above and self.level < len(self.levels) - 1:
+            self.set_level(self.level + 1)
+        elif self.calm_frames >= self.restore_after and self.level > 0:
+            self.set_level(self.level - 1)
+
+    def set_level(self, level):
+        self.level = level
+        self.samples.clear()
+        self.total = 0
+        self.calm_frames = 0
+
+    def budget(self, count):
+        # count scaled to the current quality, never scaling a nonzero count down to nothing
+        if count <= 0:
+            return 0
+        return max(1, round(count * self.scale))
@@ -0,0 +1,134 @@
+from collections import OrderedDict
+
+import pygame
+
+
+class TextCache:
+    # Rendered text surfaces keyed on (font, text, color, antialias). The least recently used
+    # surfaces are dropped once the cache holds more than max_bytes of pixels.
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self.surfaces = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, antialias, color):
+        key = (font, text, tuple(color), antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        self.used_bytes += self.surface_bytes(surface)
+        while self.used_bytes > self.max_bytes and len(self.surfaces) > 1:
+            key, evicted = self.surfaces.popitem(last=False)
+            self.used_bytes -= self.surface_bytes(evicted)
+        return surface
+
+    def size(self, font, text):
+        return self.render(font, text, True, (255, 255, 255)).get_size()
+
+    def clear(self):
+        self.surfaces.clear()
+        self.used_bytes = 0
+
+    @staticmethod
+    def surface_bytes(surface):
+        return surface.get_pitch() * surface.get_height()
+
+
+class DirtyRenderer:
+    # Repaints only the rects drawn last frame and this frame from a cached background, and
+    # pushes just those rects to the screen. Frames that change the whole window fall back to
+    # a full repaint.
+    def __init__(self, display, max_rects=500):
+        self.display = display
+        self.max_rects = max_rects
+
+        self.background = pygame.Surface(display.get_size())
+        self.background_key = None
+
+        self.previous = []
+        self.current = []
+        self.full_frames = 1
+
+    def set_background(self, key, paint):
+        # paint draws the static layer; it only runs again when key changes
+        if key != self.background_key:
+            paint(self.background)
+            self.background_key = key
+            self.invalidate()
+
+    def invalidate(self):
+        # The whole window changes this frame, so this frame and the next are repainted in full
+        self.full_frames = 2
+
+    def begin(self):
+        if self.full_frames > 0 or len(self.previous) > self.max_rects:
+            self.display.blit(self.background, (0, 0))
+        else:
+            for rect in self.previous:
+                self.display.blit(self.background, rect, rect)
+
+    def mark(self, rect):
+        self.current.append(rect)
+        return rect
+
+    def present(self):
+        if self.full_frames > 0 or len(self.previous) + len(self.current) > self.max_rects:
+            pygame.display.update()
+        else:
+            pygame.display.update(self.previous + self.current)
+
+        self.previous = self.current
+        self.current = []
+        self.full_frames = max(0, self.full_frames - 1)
+
+
+class CardRenderer:
+    # Card faces are rasterized once per (name, size, color), so a card in any of its states is a
+    # single blit, and ability descriptions are wrapped once per (text, font, width).
+    def __init__(self, text_cache):
+        self.text_cache = text_cache
+        self.faces = {}
+        self.layouts = {}
+
+    def face(self, font, name, size, color):
+        key = (font, name, size, color)
+        face = self.faces.get(key)
+        if face is None:
+            face = pygame.Surface(pygame.Rect((0, 0), size).size, pygame.SRCALPHA)
+            pygame.draw.rect(face, color, face.get_rect(), 0, 16)
+            name_text = self.text_cache.render(font, name, True, (0, 0, 0))
+            font_size = name_text.get_size()
+            face.blit(name_text, (size[0]/2 - font_size[0]/2, size[1]/2 - font_size[1]/2))
+            self.faces[key] = face
+        return face
+
+    def wrap(self, font, text, width):
+        # Greedy word wrap; a line is closed once adding the next word would make it wider than width
+        key = (font, text, width)
+        lines = self.layouts.get(key)
+        if lines is None:
+            lines = []
+            words = ""
+            for word in text.split():
+                if font.size(words + word)[0] > width:
+                    lines.append(words)
+                    words = word + " "
+                else:
+                    words += (word + " ")
+            if words != "":
+                lines.append(words)
+            self.layouts[key] = lines
+        return lines
+
+    def clear(self):
+        self.faces.clear()
+        self.layouts.clear()
@@ -0,0 +1,308 @@
+import argparse
+import array
+import bisect
+import struct
+
+import pygame
+
+from world import PlatformIndex, WorldGenerator
+
+
+# A replay file is a header, an index of keyframes, the input events and then the keyframes:
+#
+#   header    magic, version, seed, keyframe interval, frames, event count, keyframe count
+#   index     (frame, offset, size) of every keyframe, offsets from the start of the file
+#   events    (frame, key code) of every key press and release that affects the game
+#   keyframes the full state of the run at the start of their frame, before that frame's input
+#
+# Playback restores the last keyframe at or before a frame and simulates only the rest of the way.
+MAGIC = b"SCRP"
+VERSION = 1
+# Seconds of game time between keyframes
+KEYFRAME_SECONDS = 30
+
+HEADER = struct.Struct("<4sBIIIII")
+INDEX_ENTRY = struct.Struct("<III")
+EVENT = struct.Struct("<IB")
+
+# Only these keys change the game. An event stores the key's position here, plus KEY_UP for a release.
+KEYS = (pygame.K_a, pygame.K_d, pygame.K_SPACE, pygame.K_TAB, pygame.K_q, pygame.K_e, pygame.K_RETURN, pygame.K_r)
+KEY_UP = 0x80
+
+# Every per-run value of the game that fits a single struct field
+STATE_FIELDS = (
+    ("frame", "I"), ("seed", "I"), ("run_start_frame", "I"),
+    ("player_jumps", "i"), ("player_grounded", "?"), ("player_left", "?"), ("player_right", "?"), ("player_speed", "d"),
+    ("player_score", "q"), ("player_final_score", "q"), ("player_high_score", "q"),
+    ("limit_jumps", "?"), ("triple_jump", "?"), ("bomb_set", "?"), ("boost_jump", "?"), ("boost_speed", "?"),
+    ("extra_life", "i"), ("revive", "?"), ("zero_gravity", "?"), ("extra_points", "?"),
+    ("top_platform_height", "i"), ("rain_count", "i"),
+    ("camera_y", "d"), ("camera_speed", "d"), ("gravity", "d"), ("time", "d"),
+    ("game_over", "?"), ("selected_ability", "B"), ("ability_display", "?"),
+)
+STATE = struct.Struct("<" + "".join(code for name, code in STATE_FIELDS))
+PLAYER = struct.Struct("<iidd")
+POSITION = struct.Struct("<ii")
+WORLD = struct.Struct("<IIii")
+FX_RNG = struct.Struct("<16s16sBI")
+
+
+class Reader:
+    def __init__(self, data, offset=0):
+        self.data = data
+        self.offset = offset
+
+    def unpack(self, layout):
+        values = layout.unpack_from(self.data, self.offset)
+        self.offset += layout.size
+        return values
+
+    def read(self, codes):
+        values = struct.unpack_from("<" + codes, self.data, self.offset)
+        self.offset += struct.calcsize("<" + codes)
+        return values
+
+
+def catalog_indices(game, names):
+    # Cards are stored by their place in the catalog, which is the same in every game
+    catalog = {ability.name: index for index, ability in enumerate(game.ability_catalog)}
+    return [catalog[name] for name in names]
+
+
+def encode_keyframe(game):
+    parts = [STATE.pack(*(getattr(game, name) for name, code in STATE_FIELDS))]
+    parts.append(PLAYER.pack(game.player_character.x, game.player_character.y, game.player_velocity.x, game.player_velocity.y))
+
+    # Gameplay draws from the Mersenne Twister, effects from PCG64
+    version, words, gauss_next = game.rng.getstate()
+    parts.append(array.array("I", words).tobytes())
+    parts.append(struct.pack("<?d", gauss_next is not None, gauss_next or 0))
+    fx_state = game.fx_rng.bit_generator.state
+    parts.append(FX_RNG.pack(fx_state["state"]["state"].to_bytes(16, "little"), fx_state["state"]["inc"].to_bytes(16, "little"), fx_state["has_uint32"], fx_state["uinteger"]))
+
+    # The generator only needs the start of the chunk it hands out next
+    chunk_starts, next_chunk = game.world.resume_state()
+    known = max(known for known in chunk_starts if known <= next_chunk)
+    parts.append(WORLD.pack(next_chunk, known, *chunk_starts[known]))
+    parts.append(POSITION.pack(game.top_platform.x, game.top_platform.y))
+    parts.append(struct.pack("<I", len(game.platforms)))
+    parts.append(array.array("i", [value for platform in game.platforms for value in platform.topleft]).tobytes())
+
+    for names in ([ability.name for ability in game.abilities], [ability.name for ability in game.ability_deck], game.abilities_used):
+        indices = catalog_indices(game, names)
+        parts.append(struct.pack(f"<H{len(indices)}B", len(indices), *indices))
+
+    entries = game.effects.entries()
+    parts.append(struct.pack("<dB", game.effects.now, len(entries)))
+    for expires, key, callback in entries:
+        encoded_key = key.encode()
+        parts.append(struct.pack(f"<dBB{len(encoded_key)}s", expires, catalog_indices(game, [callback.__self__.name])[0], len(encoded_key), encoded_key))
+    return b"".join(parts)
+
+
+def decode_keyframe(game, data):
+    # Puts game in the state encoded in data. Particles are cosmetic and start over empty.
+    reader = Reader(data)
+    for (name, code), value in zip(STATE_FIELDS, reader.unpack(STATE)):
+        setattr(game, name, value)
+    x, y, velocity_x, velocity_y = reader.unpack(PLAYER)
+    game.player_character = pygame.Rect((x, y), game.player_size)
+    game.player_velocity = pygame.Vector2(velocity_x, velocity_y)
+
+    words = reader.read("625I")
+    has_gauss, gauss_next = reader.read("?d")
+    game.rng.setstate((3, words, gauss_next if has_gauss else None))
+    state, increment, has_uint32, uinteger = reader.unpack(FX_RNG)
+    game.fx_rng.bit_generator.state = {
+        "bit_generator": "PCG64",
+        "state": {"state": int.from_bytes(state, "little"), "inc": int.from_bytes(increment, "little")},
+        "has_uint32": has_uint32,
+        "uinteger": uinteger,
+    }
+
+    next_chunk, known, chunk_x, chunk_height = reader.unpack(WORLD)
+    game.top_platform = pygame.Rect(reader.unpack(POSITION), game.platform_size)
+    count, = reader.read("I")
+    positions = reader.read(f"{2 * count}i")
+    game.platforms = PlatformIndex(game.platform_size[1])
+    for index in range(count):
+        game.platforms.append(pygame.Rect(positions[2 * index], positions[2 * index + 1], game.platform_size[0], game.platform_size[1]))
+    game.world.stop()
+    game.world = WorldGenerator(game.seed, game.top_platform.x, game.edge_left, game.edge_right, background=not game.headless, resume=({known: (chunk_x, chunk_height)}, next_chunk))
+
+    card_lists = []
+    for i in range(3):
+        count, = reader.read("H")
+        card_lists.append([game.ability_catalog[index] for index in reader.read(f"{count}B")])
+    game.abilities, game.ability_deck, used = card_lists
+    game.abilities_used = [ability.name for ability in used]
+    for key, ability in enumerate(game.abilities):
+        pos = pygame.Vector2((game.ability_display_bar.x + (game.draw_margin * (key + 1)) + (game.card_size[0] * key), game.ability_display_bar.y - (game.card_size[1]/2)))
+        ability.__init__(ability.name, ability.description, pos, game.card_size, game, ability.cost)
+        ability.selected = key == game.selected_ability
+
+    now, count = reader.read("dB")
+    entries = []
+    for i in range(count):
+        expires, index, length = reader.read("dBB")
+        key, = reader.read(f"{length}s")
+        entries.append((expires, key.decode(), game.ability_catalog[index].expire))
+    game.effects.load(now, entries)
+
+    for particles in game.particle_systems():
+        particles.clear()
+    game.previous_camera_y = game.camera_y
+    game.previous_player_position = game.player_character.topleft
+    game.frozen_key = None
+    game.rain_sfx.set_volume(0 if game.ability_display else .3)
+
+
+class ReplayRecorder:
+    # Keeps a keyframe every keyframe_interval frames (KEYFRAME_SECONDS by default) while the game runs
+    # and writes the replay at the end
+    def __init__(self, game, path, keyframe_interval=None):
+        # Imported here because main imports this module for recording
+        from main import STEP_RATE
+
+        self.game = game
+        self.path = path
+        self.keyframe_interval = keyframe_interval or KEYFRAME_SECONDS * STEP_RATE
+        self.seed = game.session_seed
+        self.events = []
+        self.keyframes = [(game.frame, encode_keyframe(game))]
+
+    def log(self, frame, event_type, key):
+        if key in KEYS:
+            self.events.append(EVENT.pack(frame, KEYS.index(key) | (KEY_UP if event_type == pygame.KEYUP else 0)))
+
+    def capture(self):
+        # Called after every step, so a keyframe holds the state before its frame's input
+        if self.game.frame % self.keyframe_interval == 0:
+            self.keyframes.append((self.game.frame, encode_keyframe(self.game)))
+
+    def save(self):
+        # The last keyframe is the state the session ended in, which holds the score it claims
+        if self.keyframes[-1][0] != self.game.frame:
+            self.keyframes.append((self.game.frame, encode_keyframe(self.game)))
+
+        offset = HEADER.size + INDEX_ENTRY.size * len(self.keyframes) + EVENT.size * len(self.events)
+        index = []
+        for frame, data in self.keyframes:
+            index.append(INDEX_ENTRY.pack(frame, offset, len(data)))
+            offset += len(data)
+
+        with open(self.path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.seed, self.keyframe_interval, self.game.frame, len(self.events), len(self.keyframes)))
+            f.write(b"".join(index))
+            f.write(b"".join(self.events))
+            f.write(b"".join(data for frame, data in self.keyframes))
+
+
+class Replay:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = f.read()
+        reader = Reader(self.data)
+        magic, version, self.seed, self.keyframe_interval, self.frames, event_count, keyframe_count = reader.unpack(HEADER)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} replay")
+        self.index = [reader.unpack(INDEX_ENTRY) for i in range(keyframe_count)]
+        self.keyframe_frames = [frame for frame, offset, size in self.index]
+        self.events = [reader.unpack(EVENT) for i in range(event_count)]
+        for frame, code in self.events:
+            if code & ~KEY_UP >= len(KEYS):
+                raise ValueError(f"event at frame {frame} has unknown key code {code:#x}")
+        self.event_frames = [frame for frame, code in self.events]
+
+    def input_log(self, start=0):
+        # Events from frame start on, as (frame, event type, key) for Game.play_inputs
+        first = bisect.bisect_left(self.event_frames, start)
+        return [(frame, pygame.KEYUP if code & KEY_UP else pygame.KEYDOWN, KEYS[code & ~KEY_UP]) for frame, code in self.events[first:]]
+
+    def keyframe(self, frame):
+        # (frame, data) of the last keyframe at or before frame
+        frame, offset, size = self.index[bisect.bisect_right(self.keyframe_frames, frame) - 1]
+        return frame, memoryview(self.data)[offset:offset + size]
+
+    def final_score(self):
+        # Score the recording ended on, as claimed by its last keyframe
+        frame, offset, size = self.index[-1]
+        if frame != self.frames:
+            raise ValueError("replay has no final keyframe")
+        state = STATE.unpack_from(self.data, offset)
+        return state[[name for name, code in STATE_FIELDS].index("player_final_score")]
+
+    def start(self, game):
+        # Starts game over from the beginning of the recording, driven by its input log
+        game.frame = 0
+        game.session_seed = self.seed
+        game.restart(self.seed)
+        game.play_inputs(self.input_log())
+
+    def seek(self, game, frame):
+        # Brings game to the start of frame, simulating without rendering from the keyframe before it
+        keyframe, data = self.keyframe(frame)
+        decode_keyframe(game, data)
+        game.play_inputs(self.input_log(keyframe))
+        while game.frame < frame:
+            game.tick()
+        game.last_update = None
+
+
+def play(replay, start, speed, seek_seconds=10):
+    # Imported here because main imports this module for recording
+    from main import STEP_RATE, WINDOW_SIZE, Game
+
+    game = Game(WINDOW_SIZE, "Salio's Clamber replay", r"salios_logo.png", seed=replay.seed, record_scores=False)
+    replay.seek(game, start)
+    fast_forward = False
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                game.close()
+                pygame.quit()
+                return
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_RIGHT:
+                    replay.seek(game, min(replay.frames, game.frame + seek_seconds * STEP_RATE))
+                elif event.key == pygame.K_LEFT:
+                    replay.seek(game, max(0, game.frame - seek_seconds * STEP_RATE))
+                elif event.key == pygame.K_f:
+                    fast_forward = not fast_forward
+
+        if game.frame >= replay.frames:
+            # The recording is over; hold the last frame
+            game.render()
+            pygame.display.update()
+            game.clock.tick(STEP_RATE)
+            continue
+        if fast_forward:
+            # The steps in between are never drawn
+            for i in range(min(speed - 1, replay.frames - game.frame - 1)):
+                game.tick()
+        game.update()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or watch a recorded session")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    info = subparsers.add_parser("info", help="print what a replay contains")
+    info.add_argument("path")
+    watch = subparsers.add_parser("play", help="watch a replay: left and right seek, F toggles fast forward")
+    watch.add_argument("path")
+    watch.add_argument("--start", type=int, default=0, metavar="FRAME", help="frame to start watching from")
+    watch.add_argument("--speed", type=int, default=8, help="steps per drawn frame while fast forwarding")
+    args = parser.parse_args()
+
+    replay = Replay(args.path)
+    if args.command == "info":
+        from main import STEP_RATE
+
+        print(f"seed {replay.seed}, {replay.frames} frames ({replay.frames / STEP_RATE:.0f}s), {len(replay.events)} events, "
+              f"{len(replay.index)} keyframes every {replay.keyframe_interval} frames, {len(replay.data)} bytes")
+    else:
+        play(replay, args.start, args.speed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class ScoreStore:
+    # The high score stays in high_score_path as a single number and is read once; run history goes
+    # to a SQLite database. Every write happens on a worker thread, so a death never waits on disk.
+    def __init__(self, high_score_path="data.txt", database_path="runs.db"):
+        self.high_score_path = high_score_path
+        self.database_path = database_path
+        self.high_score = self.read_high_score()
+
+        self.jobs = queue.Queue()
+        self.worker = threading.Thread(target=self.work, daemon=True)
+        self.worker.start()
+
+    def read_high_score(self):
+        try:
+            with open(self.high_score_path) as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return 0
+
+    def write_high_score(self, score):
+        # Written next to the old file and renamed over it, so a crash leaves one or the other intact
+        temporary_path = self.high_score_path + ".tmp"
+        with open(temporary_path, "w") as f:
+            f.write(str(score))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary_path, self.high_score_path)
+
+    def connect(self):
+        connection = sqlite3.connect(self.database_path)
+        connection.execute("CREATE TABLE IF NOT EXISTS runs ("
+                           "id INTEGER PRIMARY KEY, finished_at REAL NOT NULL, day TEXT NOT NULL, score INTEGER NOT NULL, "
+                           "duration_frames INTEGER NOT NULL, seed INTEGER NOT NULL, abilities TEXT NOT NULL)")
+        connection.execute("CREATE INDEX IF NOT EXISTS runs_by_score ON runs (score DESC)")
+        connection.execute("CREATE INDEX IF NOT EXISTS runs_by_day ON runs (day, score DESC)")
+        return connection
+
+    def work(self):
+        # A job that fails is logged and dropped; the worker carries on with the rest of the queue, so
+        # one bad write never loses later runs or leaves flush() waiting forever
+        connection = None
+        while True:
+            job = self.jobs.get()
+            try:
+                if job is None:
+                    break
+                kind, arguments = job
+                if kind == "high_score":
+                    self.write_high_score(*arguments)
+                elif kind == "run":
+                    if connection is None:
+                        connection = self.connect()
+                    with connection:
+                        connection.execute("INSERT INTO runs (finished_at, day, score, duration_frames, seed, abilities) VALUES (?, ?, ?, ?, ?, ?)", arguments)
+            except Exception:
+                logger.exception("Could not save %s", job[0])
+            finally:
+                self.jobs.task_done()
+        if connection is not None:
+            connection.close()
+
+    def record_run(self, score, duration_frames, seed, abilities):
+        # Returns True when the run set a new high score
+        finished_at = time.time()
+        day = time.strftime("%Y-%m-%d", time.localtime(finished_at))
+        self.jobs.put(("run", (finished_at, day, score, duration_frames, seed, json.dumps(abilities))))
+
+        if score > self.high_score:
+            self.high_score = score
+            self.jobs.put(("high_score", (score,)))
+            return True
+        return False
+
+    def leaderboard(self, limit=10, day=None):
+        # Best runs overall, or on one day given as YYYY-MM-DD, as (score, duration_frames, seed, abilities, day) rows
+        self.flush()
+        connection = self.connect()
+        try:
+            if day is None:
+                rows = connection.execute("SELECT score, duration_frames, seed, abilities, day FROM runs ORDER BY score DESC LIMIT ?", (limit,))
+            else:
+                rows = connection.execute("SELECT score, duration_frames, seed, abilities, day FROM runs WHERE day = ? ORDER BY score DESC LIMIT ?", (day, limit))
+            return [(score, duration, seed, json.loads(abilities), run_day) for score, duration, seed, abilities, run_day in rows]
+        finally:
+            connection.close()
+
+    def flush(self):
+        self.jobs.join()
+
+    def close(self):
+        self.jobs.put(None)
+        self.worker.join()
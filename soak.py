@@ -0,0 +1,239 @@
+import os
+
+# Soak runs happen unattended on a CI box or a spare kiosk, without a real window or sound card
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pygame
+
+from bench import catalog_ability, idle_climb, press, run_frames
+from main import STEP_RATE, WINDOW_SIZE, Ability, Bomb, Game
+
+
+def release(game, key):
+    game.handle_event(pygame.event.Event(pygame.KEYUP, key=key))
+
+
+# Every run ends after this long, so a soak covers long runs and restarts alike
+RUN_FRAMES = STEP_RATE * 300
+
+
+def kiosk_player(game, frame):
+    # Climbs a platform at a time while walking back and forth, and plays a card every ten seconds
+    # with score enough for any card and a reshuffle every other hand. Platforms stream in and out,
+    # the deck churns through the hand, timed abilities fill the effect heap and a bomb every half
+    # minute smashes platforms into bursts. Climbing outpaces the camera, so the player never falls
+    # on its own; every RUN_FRAMES the run is ended and a second later restarted.
+    if game.game_over:
+        if frame % STEP_RATE == 0:
+            press(game, pygame.K_r)
+        return
+    if frame % RUN_FRAMES == RUN_FRAMES - 1:
+        game.extra_life = 0
+        game.end_game()
+        return
+    idle_climb(game, frame)
+
+    phase = frame % 600
+    if phase == 0:
+        press(game, pygame.K_a)
+    elif phase == 120:
+        release(game, pygame.K_a)
+        press(game, pygame.K_d)
+    elif phase == 240:
+        release(game, pygame.K_d)
+    elif phase == 300 and not game.ability_display:
+        press(game, pygame.K_TAB)
+    elif phase in (310, 320, 330) and game.ability_display:
+        press(game, pygame.K_e)
+    elif phase == 340 and game.ability_display and frame % 1200 < 600:
+        press(game, pygame.K_r)
+    elif phase == 360 and game.ability_display:
+        press(game, pygame.K_RETURN)
+    elif phase == 370 and game.ability_display:
+        press(game, pygame.K_TAB)
+
+    if frame % 1800 == 900 and not game.bomb_set:
+        catalog_ability(game, Bomb).triggered()
+
+
+def container_lengths(game):
+    # Every collection that lives across frames
+    return {
+        "smoke_particles": len(game.smoke_particles),
+        "rain_particles": len(game.rain_particles),
+        "rain_splash_particles": len(game.rain_splash_particles),
+        "particles": len(game.particles),
+        "card_particles": len(game.card_particles),
+        "platforms": len(game.platforms),
+        "ability_deck": len(game.ability_deck),
+        "abilities": len(game.abilities),
+        "abilities_used": len(game.abilities_used),
+        "effect_heap": len(game.effects.heap),
+        "chunk_starts": len(game.world.chunk_starts),
+        "replay_events": len(game.replay_events or ()),
+        "text_cache_kib": game.text_cache.used_bytes / 1024,
+        "card_faces": len(game.card_renderer.faces),
+        "card_layouts": len(game.card_renderer.layouts),
+        "particle_sprites": sum(len(particles.sprites) for particles in game.particle_systems()),
+    }
+
+
+def cache_limits(game):
+    # Caches fill up as new text and sprites appear and then stay at their limit, so they fail by
+    # passing it rather than by growing
+    return {
+        "text_cache_kib": game.text_cache.max_bytes / 1024,
+        "particle_sprites": sum(particles.max_sprites for particles in game.particle_systems()),
+    }
+
+
+def sample(game):
+    gc_counts = gc.get_count()
+    objects = gc.get_objects()
+    values = {
+        "traced_kib": tracemalloc.get_traced_memory()[0] / 1024,
+        "gc_objects": len(objects),
+        "gc_gen0": gc_counts[0],
+        "gc_gen1": gc_counts[1],
+        "gc_gen2": gc_counts[2],
+        # Cards are re-initialized on every draw, so a leak there would show up as extra instances
+        "ability_objects": sum(isinstance(item, Ability) for item in objects),
+    }
+    del objects
+    values.update(container_lengths(game))
+    return values
+
+
+# Growth below the larger of these is noise: a fraction of the series' early level, or an absolute floor
+RELATIVE_GROWTH = .1
+GROWTH_FLOORS = {"traced_kib": 512, "gc_objects": 2000, "gc_gen0": 700, "gc_gen1": 10, "gc_gen2": 10}
+DEFAULT_FLOOR = 8
+
+
+def trend(values):
+    # Growth from the first third of the samples to the last third, by their means, and the slope
+    # of a straight line through all of them per sample. Comparing means lets sawtooth series that
+    # empty out every run, like particles, pass while anything that keeps climbing shows.
+    values = np.asarray(values, dtype=float)
+    third = max(1, len(values) // 3)
+    early = values[:third].mean()
+    growth = values[-third:].mean() - early
+    slope = np.polyfit(np.arange(len(values)), values, 1)[0] if len(values) > 1 else 0.0
+    return early, growth, slope
+
+
+def growing(name, values):
+    early, growth, slope = trend(values)
+    return slope > 0 and growth > max(RELATIVE_GROWTH * abs(early), GROWTH_FLOORS.get(name, DEFAULT_FLOOR))
+
+
+def allocation_sites(baseline, final, limit=15):
+    # Source lines whose live allocations grew the most between two tracemalloc snapshots, leaving
+    # out tracemalloc itself and the samples this harness keeps
+    ignored = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"))
+    stats = final.filter_traces(ignored).compare_to(baseline.filter_traces(ignored), "lineno")
+    return [stat for stat in stats if stat.size_diff > 0][:limit]
+
+
+def soak(frames, interval, warmup, seed, headless, progress=None):
+    # Tracing starts before the game is built, so the particle pools and everything else a restart
+    # replaces count the same in the baseline as after it
+    tracemalloc.start()
+    game = Game(WINDOW_SIZE, "Salio's Clamber soak", r"salios_logo.png", headless, seed)
+    # The player's real high score and run history stay untouched by every run of the soak
+    if game.scores is not None:
+        game.scores.close()
+        game.scores = None
+
+    run_frames(game, kiosk_player, 0, warmup)
+    gc.collect()
+    baseline = tracemalloc.take_snapshot()
+
+    samples = []
+    frame = warmup
+    start = time.perf_counter()
+    while frame < warmup + frames:
+        count = min(interval, warmup + frames - frame)
+        run_frames(game, kiosk_player, frame, count)
+        frame += count
+        samples.append((frame, sample(game)))
+        if progress is not None:
+            progress(frame - warmup, frames, time.perf_counter() - start)
+
+    gc.collect()
+    final = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    game.close()
+    return samples, allocation_sites(baseline, final), cache_limits(game)
+
+
+def report(samples, sites, limits, frames, elapsed):
+    # Report lines and the names of every series that kept growing or went past its limit
+    names = list(samples[0][1])
+    lines = [f"Soaked {frames} frames ({frames / STEP_RATE / 3600:.2f} h of game time) in {elapsed:.0f}s, {len(samples)} samples", ""]
+    lines.append(f"{'series':<24}{'first':>12}{'last':>12}{'growth':>12}{'slope':>12}")
+    failures = []
+    for name in names:
+        values = [values[name] for frame, values in samples]
+        early, growth, slope = trend(values)
+        flag = ""
+        if name in limits:
+            if max(values) > limits[name]:
+                flag = f"  OVER LIMIT {limits[name]:.0f}"
+                failures.append(name)
+        elif growing(name, values):
+            flag = "  GROWING"
+            failures.append(name)
+        lines.append(f"{name:<24}{values[0]:12.0f}{values[-1]:12.0f}{growth:+12.1f}{slope:+12.3f}{flag}")
+
+    lines.append("")
+    lines.append("Allocation sites that grew since the end of warmup:")
+    for stat in sites:
+        frame = stat.traceback[0]
+        lines.append(f"  {stat.size_diff / 1024:+9.1f} KiB {stat.count_diff:+7d} blocks  {frame.filename}:{frame.lineno}")
+    if not sites:
+        lines.append("  none")
+    return lines, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play the game unattended for hours of game time and fail if memory or any container keeps growing")
+    parser.add_argument("--hours", type=float, default=2, help="hours of game time to simulate")
+    parser.add_argument("--interval", type=int, default=STEP_RATE * 60, metavar="FRAMES", help="frames between samples")
+    parser.add_argument("--warmup", type=int, default=STEP_RATE * 60, metavar="FRAMES", help="frames run before the baseline is taken")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--headless", action="store_true", help="soak the simulation only, without rendering")
+    parser.add_argument("--report", metavar="PATH", help="also write the report to PATH")
+    args = parser.parse_args()
+
+    frames = int(args.hours * 3600 * STEP_RATE)
+    if frames // args.interval < 3:
+        parser.error("a soak needs at least three samples; lower --interval or raise --hours")
+    start = time.perf_counter()
+
+    def progress(done, total, elapsed):
+        print(f"\r{done / total:6.1%}  {done / elapsed:.0f} fps", end="", flush=True)
+
+    samples, sites, limits = soak(frames, args.interval, args.warmup, args.seed, args.headless, progress)
+    print()
+    lines, failures = report(samples, sites, limits, frames, time.perf_counter() - start)
+    print("\n".join(lines))
+    if args.report is not None:
+        with open(args.report, "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+    if failures:
+        print(f"\nGrowing: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
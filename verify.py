@@ -0,0 +1,109 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import glob
+import json
+import multiprocessing
+import time
+
+from main import WINDOW_SIZE, Game
+from replay import Replay
+
+
+# How often a run checks its CPU time against the limit
+CHECK_INTERVAL = 600
+
+game = None
+
+
+def init_worker():
+    # Every worker builds one headless game and restarts it for each submission
+    global game
+    game = Game(WINDOW_SIZE, "Salio's Clamber verifier", r"salios_logo.png", True)
+
+
+def verify(path, cpu_limit):
+    # Re-simulates a submitted replay from its seed and inputs alone and compares the final score
+    # with the one the submission claims. Nothing else in the file is trusted.
+    start = time.process_time()
+    result = {"path": path}
+    # A malformed submission must never take the rest of the batch down with it, so anything the
+    # file makes go wrong while parsing or simulating only rejects that file
+    status = None
+    try:
+        replay = Replay(path)
+        claimed = replay.final_score()
+        replay.start(game)
+        while game.frame < replay.frames:
+            game.update()
+            if game.frame % CHECK_INTERVAL == 0 and time.process_time() - start > cpu_limit:
+                status = "timeout"
+                break
+    except Exception as error:
+        result.update(status="invalid", error=f"{type(error).__name__}: {error}", cpu_seconds=time.process_time() - start)
+        return result
+
+    if status is None:
+        status = "verified" if game.player_final_score == claimed else "mismatch"
+    result.update(status=status, claimed=claimed, score=game.player_final_score, frames=game.frame, cpu_seconds=time.process_time() - start)
+    return result
+
+
+def verify_all(paths, workers=None, cpu_limit=60):
+    # One result per path, in the same order, with the workers sharing the submissions in chunks
+    with multiprocessing.Pool(workers, initializer=init_worker) as pool:
+        arguments = [(path, cpu_limit) for path in paths]
+        return pool.starmap(verify, arguments, chunksize=max(1, len(paths) // (4 * (workers or os.cpu_count() or 1))))
+
+
+def summarize(results, wall_seconds, workers):
+    statuses = {}
+    for result in results:
+        statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+    cpu_seconds = sum(result["cpu_seconds"] for result in results)
+    frames = sum(result.get("frames", 0) for result in results)
+    return {
+        "runs": len(results),
+        "statuses": statuses,
+        "workers": workers,
+        "wall_seconds": wall_seconds,
+        "cpu_seconds": cpu_seconds,
+        # Throughput that does not depend on how many cores the batch ran on
+        "runs_per_core_second": len(results) / cpu_seconds if cpu_seconds else 0,
+        "frames_per_core_second": frames / cpu_seconds if cpu_seconds else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify a directory of submitted replays by simulating them again")
+    parser.add_argument("directory", help="directory of .scrp replay files")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--cpu-limit", type=float, default=60, metavar="SECONDS", help="CPU time a single run may take before it is rejected")
+    parser.add_argument("--report", metavar="PATH", help="write the summary and every result to PATH as JSON")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.directory, "*.scrp")))
+    workers = args.workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    results = verify_all(paths, workers, args.cpu_limit)
+    summary = summarize(results, time.perf_counter() - start, workers)
+
+    print(f"{summary['runs']} runs in {summary['wall_seconds']:.1f}s on {workers} workers: "
+          + ", ".join(f"{count} {status}" for status, count in sorted(summary["statuses"].items())))
+    print(f"{summary['runs_per_core_second']:.2f} runs per core-second, {summary['frames_per_core_second']:.0f} frames per core-second")
+    for result in results:
+        if result["status"] == "invalid":
+            print(f"invalid   {result['path']}  {result['error']}")
+        elif result["status"] != "verified":
+            print(f"{result['status']:<9} {result['path']}  claimed {result['claimed']}, simulated {result['score']} after {result['frames']} frames")
+
+    if args.report is not None:
+        with open(args.report, "w") as f:
+            json.dump({"summary": summary, "results": results}, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import bisect
+import queue
+import random
+import threading
+
+
+def platform_key(platform):
+    return -platform.y
+
+
+class PlatformIndex:
+    # Platforms are pygame Rects, generated bottom to top, so the list is always sorted by descending y.
+    # Scrolling moves every platform by the same amount and culling only drops entries,
+    # so that order never breaks and every query below is a bisection.
+    def __init__(self, platform_height):
+        self.platform_height = platform_height
+        self.platforms = []
+
+    def __len__(self):
+        return len(self.platforms)
+
+    def __iter__(self):
+        return iter(self.platforms)
+
+    def __getitem__(self, index):
+        return self.platforms[index]
+
+    def append(self, platform):
+        self.platforms.append(platform)
+
+    def split(self, y):
+        # Index of the first platform whose top is above y; every platform before it is at or below y
+        return bisect.bisect_right(self.platforms, -y, key=platform_key)
+
+    def between(self, top, bottom):
+        # Platforms reaching into the horizontal band top <= y < bottom
+        start = self.split(bottom)
+        end = bisect.bisect_left(self.platforms, self.platform_height - top, start, key=platform_key)
+        return self.platforms[start:end]
+
+    def overlapping(self, rect):
+        return [platform for platform in self.between(rect.top, rect.bottom) if platform.colliderect(rect)]
+
+    def nearest_above(self, y):
+        index = self.split(y)
+        if index < len(self.platforms):
+            return self.platforms[index]
+        return None
+
+    def top_visible(self, top=0):
+        index = self.split(top) - 1
+        if index >= 0:
+            return self.platforms[index]
+        return None
+
+    def cull_below(self, bottom):
+        # Removes and returns the platforms whose tops have reached bottom
+        index = self.split(bottom)
+        culled = self.platforms[:index]
+        del self.platforms[:index]
+        return culled
+
+    def remove(self, platform):
+        index = bisect.bisect_left(self.platforms, platform_key(platform), key=platform_key)
+        while self.platforms[index] is not platform:
+            index += 1
+        del self.platforms[index]
+
+
+class WorldGenerator:
+    # The tower is built in chunks of platforms. A chunk depends only on the run seed, its index and
+    # where the previous chunk ended, so any stretch can be rebuilt on demand. A worker thread keeps
+    # the next chunks ready so the game loop only has to pick them up.
+    def __init__(self, seed, start_x, edge_left, edge_right, chunk_size=25, lookahead=2, background=True, resume=None):
+        self.seed = seed
+        self.edge_left = edge_left
+        self.edge_right = edge_right
+        self.chunk_size = chunk_size
+
+        # x and height of the platform each chunk builds on, filled in as chunks are generated
+        self.chunk_starts = {0: (start_x, 0)}
+        self.lock = threading.Lock()
+        self.next_chunk = 0
+        if resume is not None:
+            # Carry on from another generator's resume_state() instead of the first chunk
+            self.chunk_starts, self.next_chunk = dict(resume[0]), resume[1]
+
+        self.ready = None
+        self.stopped = False
+        if background:
+            self.ready = queue.Queue(lookahead)
+            self.worker = threading.Thread(target=self.work, daemon=True)
+            self.worker.start()
+
+    def chunk(self, index):
+        # (x, height) of each platform in the chunk, height measured upwards from the first platform
+        with self.lock:
+            known = max(known for known in self.chunk_starts if known <= index)
+            for missing in range(known, index):
+                self.generate(missing)
+            return self.generate(index)
+
+    def generate(self, index):
+        rng = random.Random((self.seed << 32) | index)
+        x, height = self.chunk_starts[index]
+        platforms = []
+        for i in range(self.chunk_size):
+            random_offset = rng.randint(300, 350)
+            if (x - random_offset) < self.edge_left:
+                x += random_offset
+            elif (x + random_offset) > self.edge_right:
+                x -= random_offset
+            else:
+                x += random_offset * rng.choice([-1, 1])
+            height += rng.randint(200, 250)
+            platforms.append((x, height))
+
+        self.chunk_starts[index + 1] = (x, height)
+        return platforms
+
+    def work(self):
+        index = self.next_chunk
+        while not self.stopped:
+            chunk = self.chunk(index)
+            while not self.stopped:
+                try:
+                    self.ready.put((index, chunk), timeout=.1)
+                    break
+                except queue.Full:
+                    continue
+            index += 1
+
+    def pull(self):
+        # Next chunk of the tower, taken from the worker when it is ready and generated in place otherwise
+        index = self.next_chunk
+        self.next_chunk += 1
+        if self.ready is not None:
+            while True:
+                try:
+                    ready_index, chunk = self.ready.get_nowait()
+                except queue.Empty:
+                    break
+                if ready_index == index:
+                    return chunk
+        return self.chunk(index)
+
+    def resume_state(self):
+        with self.lock:
+            return dict(self.chunk_starts), self.next_chunk
+
+    def stop(self):
+        self.stopped = True